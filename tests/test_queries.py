@@ -0,0 +1,36 @@
+import pytest
+from django.core.cache import cache
+
+from core.testing import query_budget
+from posts.models import Post
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_pages_query_budget(self, client, mixer, user, group):
+        post = mixer.cycle(20).blend(Post, author=user, group=group, image='')[0]
+        budgets = {
+            '/': 2,
+            f'/group/{post.group.slug}/': 4,
+            f'/profile/{post.author.username}/': 4,
+            f'/posts/{post.id}/': 4,
+        }
+        for url, budget in budgets.items():
+            cache.clear()
+            try:
+                with query_budget(budget):
+                    client.get(url)
+            except AssertionError as e:
+                assert False, (
+                    f'Страница `{url}` делает лишние запросы к базе, '
+                    f'проверьте `select_related`. {e}'
+                )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_page_query_budget(self, user_client, another_few_posts_with_group_with_follower):
+        with query_budget(5):
+            response = user_client.get('/follow/')
+        assert len(response.context['page_obj']) == 10, (
+            'Проверьте, что на странице `/follow/` выводятся посты авторов, на которых подписан пользователь'
+        )
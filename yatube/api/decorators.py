@@ -0,0 +1,68 @@
+import hashlib
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+
+from posts.decorators import cached_page
+from posts.paginators import InvalidCursor
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def _call(view, request, *args, **kwargs):
+    """Ответ view; известные исключения превращаются в ошибки JSON."""
+    try:
+        return view(request, *args, **kwargs)
+    except Http404:
+        return error(404, 'Не найдено')
+    except InvalidCursor:
+        return error(400, 'Неверный курсор')
+    except BadRequest as exception:
+        return error(400, str(exception))
+
+
+def _with_content_etag(request, response):
+    """ETag по хешу тела: 304, если у клиента та же версия."""
+    if response.status_code != 200:
+        return response
+    etag = '"%s"' % hashlib.md5(response.content).hexdigest()
+    conditional = get_conditional_response(request, etag=etag)
+    if conditional is not None:
+        response = conditional
+    response['ETag'] = etag
+    return response
+
+
+def api_view(scopes_func=None):
+    """Обёртка view API: только чтение, ошибки в JSON и ETag.
+
+    scopes_func получает аргументы view и возвращает области лент,
+    от которых зависит ответ, или None, если объекта нет. Тогда ответ
+    кэшируется, как страница для гостей (cached_page): он не зависит
+    от пользователя. Без scopes_func ETag — хеш тела ответа,
+    и повторный запрос экономит только трафик.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return error(405, 'Метод не поддерживается')
+            if scopes_func is None:
+                return _with_content_etag(
+                    request, _call(view, request, *args, **kwargs)
+                )
+            scopes = scopes_func(*args, **kwargs)
+            if scopes is None:
+                return error(404, 'Не найдено')
+            return cached_page(
+                request, scopes, lambda: _call(view, request, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
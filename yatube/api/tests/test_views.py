@@ -0,0 +1,130 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import query_budget
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='ann')
+        cls.group = Group.objects.create(
+            title='Коты', slug='cats', description='Про котов'
+        )
+        for i in range(15):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {i}',
+                group=None if i % 2 else cls.group
+            )
+        cls.post = Post.objects.latest('id')
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Коммент {i}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'api:v1:{name}', args=args), params)
+
+    def test_feed_walks_with_cursors(self):
+        texts = []
+        response = self.get('index')
+        while True:
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            data = response.json()
+            texts += [post['text'] for post in data['results']]
+            if data['next'] is None:
+                break
+            response = self.get('index', cursor=data['next'])
+        self.assertEqual(texts, [f'Пост {i}' for i in reversed(range(15))])
+
+    def test_post_fields(self):
+        data = self.get('post_detail', self.post.id).json()
+        self.assertEqual(data['author'], {
+            'id': self.author.id, 'username': 'leo', 'name': 'Лев Толстой'
+        })
+        self.assertEqual(data['group']['slug'], 'cats')
+        self.assertIsNone(data['image'])
+        self.assertEqual(data['comments_count'], 3)
+
+    def test_fields_parameter(self):
+        data = self.get('index', fields='id,text', limit=2).json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.get('index', fields='id,password')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_author_and_group_in_one_query(self):
+        self.get('index')
+        cache.clear()
+        # Версии областей из кэша и сама страница.
+        with query_budget(1):
+            response = self.get('index', limit=10)
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_scoped_feeds(self):
+        self.assertEqual(
+            len(self.get('group_posts', 'cats', limit=100).json()['results']),
+            8
+        )
+        self.assertEqual(
+            len(self.get('profile', 'leo', limit=100).json()['results']), 15
+        )
+        comments = self.get('post_comments', self.post.id).json()
+        self.assertEqual(
+            [comment['text'] for comment in comments['results']],
+            ['Коммент 0', 'Коммент 1', 'Коммент 2']
+        )
+
+    def test_follow_feed_requires_login(self):
+        response = self.get('follow_index')
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        self.client.force_login(self.reader)
+        response = self.get('follow_index', limit=100)
+        self.assertEqual(len(response.json()['results']), 15)
+        etag = response['ETag']
+        response = self.client.get(
+            reverse('api:v1:follow_index'), {'limit': 100},
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_etag_follows_feed_versions(self):
+        response = self.get('index')
+        etag = response['ETag']
+        url = reverse('api:v1:index')
+        with query_budget(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.author, text='Новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый')
+
+    def test_errors_are_json(self):
+        for response, status in (
+            (self.get('group_posts', 'dogs'), HTTPStatus.NOT_FOUND),
+            (self.get('post_detail', 0), HTTPStatus.NOT_FOUND),
+            (self.get('index', cursor='битый'), HTTPStatus.BAD_REQUEST),
+            (self.get('index', limit=1000), HTTPStatus.BAD_REQUEST),
+            (self.client.post(reverse('api:v1:index')),
+             HTTPStatus.METHOD_NOT_ALLOWED),
+        ):
+            with self.subTest(status=status):
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
@@ -0,0 +1,86 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from posts import caching
+from posts.models import Comment, Group, Post, User
+from posts.paginators import COMMENT_ORDERING, FEED_ORDERING, CursorPaginator
+from posts.timeline import FEED_ORDERING as FOLLOW_ORDERING, feed
+
+from ..decorators import BadRequest, api_view, error
+from .serializers import CommentSerializer, PostSerializer
+
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+def page_size(request):
+    value = request.GET.get('limit', PAGE_SIZE)
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    if not 1 <= value <= MAX_PAGE_SIZE:
+        raise BadRequest(f'limit должен быть от 1 до {MAX_PAGE_SIZE}')
+    return value
+
+
+def page_response(request, queryset, serializer_class, ordering):
+    """Страница по ?cursor=: results и курсоры соседних страниц."""
+    serializer = serializer_class(request.GET.get('fields'))
+    page = CursorPaginator(
+        serializer.prepare(queryset), page_size(request), ordering
+    ).page(request.GET.get(caching.CURSOR_PARAM))
+    return JsonResponse({
+        'results': [serializer.serialize(obj) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@api_view(caching.index_page_scopes)
+def index(request):
+    return page_response(
+        request, Post.objects.all(), PostSerializer, FEED_ORDERING
+    )
+
+
+@api_view(caching.group_page_scopes)
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('id'), slug=slug)
+    return page_response(
+        request, Post.objects.filter(group=group), PostSerializer,
+        FEED_ORDERING
+    )
+
+
+@api_view(caching.profile_page_scopes)
+def profile(request, username):
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    return page_response(
+        request, Post.objects.filter(author=author), PostSerializer,
+        FEED_ORDERING
+    )
+
+
+@api_view()
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error(401, 'Нужна авторизация')
+    return page_response(
+        request, feed(request.user), PostSerializer, FOLLOW_ORDERING
+    )
+
+
+@api_view(caching.post_page_scopes)
+def post_detail(request, post_id):
+    serializer = PostSerializer(request.GET.get('fields'))
+    post = get_object_or_404(serializer.prepare(Post.objects), id=post_id)
+    return JsonResponse(serializer.serialize(post))
+
+
+@api_view(caching.post_page_scopes)
+def post_comments(request, post_id):
+    return page_response(
+        request, Comment.objects.filter(post_id=post_id), CommentSerializer,
+        COMMENT_ORDERING
+    )
@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'queue', 'status', 'attempts', 'run_at', 'finished'
+    )
+    list_filter = ('status', 'queue')
+    search_fields = ('name',)
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            finished=None
+        )
+    retry.short_description = 'Запустить заново'
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,204 @@
+"""ASGI-приложение поверх WSGI-обработчика Django.
+
+Django 2.2 не умеет асинхронных view, поэтому запрос целиком
+выполняется в ограниченном пуле потоков ASGI_THREADS. Цикл событий
+сервера держит только соединения: приём тела запроса, keep-alive и
+отдачу ответа медленному клиенту. Поток пула занят, пока работает
+view, а не пока клиент читает ответ, и медленные клиенты больше не
+съедают воркеры.
+
+Потоковые ответы (выгрузки, поток событий) читаются по куску в
+отдельном пуле ASGI_STREAM_THREADS: кусок потока событий может ждать
+секундами, и открытые потоки не должны занимать потоки, которые
+нужны обычным запросам. Отключившийся клиент обрывает поток между
+кусками.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+# Признак конца итератора ответа для next() в пуле.
+_DONE = object()
+
+
+class Response:
+    """Статус и заголовки из start_response WSGI."""
+
+    def __init__(self):
+        self.status = None
+        self.headers = None
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info is not None and self.status is not None:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ]
+
+    def start_message(self):
+        return {
+            'type': 'http.response.start',
+            'status': self.status,
+            'headers': self.headers,
+        }
+
+
+def build_environ(scope, body):
+    """Окружение WSGI (PEP 3333) для запроса ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    # PATH_INFO в WSGI — раскодированные байты пути в latin-1.
+    path = scope['path'].encode()
+    script_name = scope.get('root_path', '').encode()
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name.decode('latin-1'),
+        'PATH_INFO': path.decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class ASGIHandler:
+    def __init__(self, wsgi_application, max_workers, stream_workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+        self.stream_executor = ThreadPoolExecutor(
+            max_workers=stream_workers or max_workers,
+            thread_name_prefix='asgi-stream'
+        )
+
+    def shutdown(self):
+        self.executor.shutdown()
+        self.stream_executor.shutdown()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Протокол {scope["type"]} не поддерживается')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.shutdown
+                )
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса; большое уходит из памяти во временный файл."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode='w+b'
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    def respond(self, environ, response):
+        """Вызов WSGI-приложения в потоке пула.
+
+        Обычный ответ читается и закрывается в том же потоке, что и
+        обрабатывал запрос: request_finished закрывает соединение
+        с базой этого потока.
+        """
+        iterable = self.wsgi_application(environ, response.start_response)
+        if getattr(iterable, 'streaming', False):
+            return iterable, None
+        try:
+            return None, b''.join(iterable)
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        response = Response()
+        try:
+            iterable, content = await loop.run_in_executor(
+                self.executor, self.respond, build_environ(scope, body),
+                response
+            )
+        finally:
+            body.close()
+        await send(response.start_message())
+        if iterable is None:
+            await send({'type': 'http.response.body', 'body': content})
+            return
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        iterator = iter(iterable)
+        try:
+            while not disconnected.done():
+                chunk = await loop.run_in_executor(
+                    self.stream_executor, next, iterator, _DONE
+                )
+                if chunk is _DONE:
+                    break
+                if chunk:
+                    await send({
+                        'type': 'http.response.body', 'body': chunk,
+                        'more_body': True,
+                    })
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(
+                    self.stream_executor, iterable.close
+                )
+
+    async def wait_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+
+def get_asgi_application():
+    return ASGIHandler(
+        get_wsgi_application(), settings.ASGI_THREADS,
+        settings.ASGI_STREAM_THREADS
+    )
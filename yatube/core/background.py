@@ -0,0 +1,57 @@
+"""Локальная очередь фоновых задач процесса.
+
+Задача ставится в пул потоков только после коммита транзакции,
+чтобы воркер видел сохранённые данные. В режиме
+BACKGROUND_TASKS_EAGER задача выполняется сразу, в том же потоке.
+Отложенную задачу (submit_later) до срока держит таймер, а не поток
+пула.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_TASKS_WORKERS,
+            thread_name_prefix='background'
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась ошибкой', func)
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Выполняет func(*args, **kwargs) вне текущего запроса."""
+    if settings.BACKGROUND_TASKS_EAGER:
+        func(*args, **kwargs)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run, func, args, kwargs)
+    )
+
+
+def submit_later(delay, func, *args, **kwargs):
+    """Ставит func(*args, **kwargs) в пул через delay секунд."""
+    timer = threading.Timer(
+        delay, lambda: get_executor().submit(_run, func, args, kwargs)
+    )
+    timer.daemon = True
+    timer.start()
+    return timer
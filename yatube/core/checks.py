@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.checks import Error, register
+from django.utils.module_loading import import_string
+
+# Бэкенды, данные которых видны только своему процессу.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def process_local_cache(alias='default'):
+    """Хранит ли кэш alias данные только в памяти процесса."""
+    backend = import_string(settings.CACHES[alias]['BACKEND'])
+    return any(
+        issubclass(backend, import_string(name))
+        for name in PROCESS_LOCAL_CACHES
+    )
+
+
+@register()
+def check_durable_jobs_cache(app_configs, **kwargs):
+    """Задачи run_worker сбрасывают кэш, который видят веб-процессы."""
+    if settings.BACKGROUND_TASKS_DURABLE and process_local_cache():
+        return [Error(
+            'Задачи BACKGROUND_TASKS_DURABLE выполняет отдельный процесс '
+            'run_worker: версии лент и счётчики он сбросит только в '
+            'своём кэше.',
+            hint='Настройте общий кэш (файловый, БД) или выключите '
+                 'BACKGROUND_TASKS_DURABLE.',
+            id='core.E001',
+        )]
+    return []
@@ -0,0 +1,284 @@
+"""Фоновые задачи: декоратор @job, очереди и воркер.
+
+Функция с @job ставится в очередь вызовом .delay(). По умолчанию
+задача выполняется в пуле потоков текущего процесса после коммита
+(core.background). С BACKGROUND_TASKS_DURABLE задача пишется строкой
+Job в той же транзакции, что и данные, и её выполняет run_worker:
+падение процесса не теряет задачу, а запуски, зависшие дольше
+JOB_LOCK_TIMEOUT, возвращаются в очередь.
+
+Число одновременно выполняемых задач очереди ограничено
+JOB_QUEUES и считается по строкам Job, то есть на все воркеры сразу.
+Периодические задачи из JOB_SCHEDULE ставит в очередь сам воркер.
+"""
+import functools
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import background
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = 'default'
+
+
+class Task:
+    """Функция, которую можно выполнить в фоне через delay()."""
+
+    def __init__(self, func, queue=DEFAULT_QUEUE, retries=0, retry_delay=60):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.queue = queue
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def backoff(self, attempt):
+        """Пауза перед повтором после attempt-й неудачной попытки."""
+        return self.retry_delay * 2 ** (attempt - 1)
+
+    def delay(self, *args, **kwargs):
+        """Ставит вызов в очередь; аргументы должны сериализоваться в JSON."""
+        if settings.BACKGROUND_TASKS_EAGER:
+            self.func(*args, **kwargs)
+            return None
+        if settings.BACKGROUND_TASKS_DURABLE:
+            return enqueue(self, args, kwargs)
+        background.submit(self.run_with_retries, *args, **kwargs)
+        return None
+
+    def run_with_retries(self, *args, **kwargs):
+        self.attempt(1, args, kwargs)
+
+    def attempt(self, attempt, args, kwargs):
+        """Попытка в пуле процесса; повтор ставится в пул заново.
+
+        Пауза перед повтором не держит поток пула: в нём всего
+        BACKGROUND_TASKS_WORKERS потоков на все задачи процесса.
+        """
+        try:
+            return self.func(*args, **kwargs)
+        except Exception:
+            if attempt > self.retries:
+                raise
+            logger.warning(
+                'Задача %s, попытка %d не удалась', self.name, attempt,
+                exc_info=True
+            )
+        background.submit_later(
+            self.backoff(attempt), self.attempt, attempt + 1, args, kwargs
+        )
+        return None
+
+
+def job(func=None, *, queue=DEFAULT_QUEUE, retries=0, retry_delay=60):
+    """Декоратор фоновой задачи.
+
+        @job(queue='thumbnails', retries=2)
+        def generate(post_id):
+            ...
+
+        generate.delay(post.id)
+    """
+    if func is None:
+        return functools.partial(
+            job, queue=queue, retries=retries, retry_delay=retry_delay
+        )
+    return Task(func, queue, retries, retry_delay)
+
+
+def resolve(name):
+    task = import_string(name)
+    if not isinstance(task, Task):
+        raise TypeError(f'{name} не объявлена через @job')
+    return task
+
+
+def enqueue(task, args=(), kwargs=None, run_at=None):
+    return Job.objects.create(
+        name=task.name,
+        queue=task.queue,
+        payload=json.dumps({'args': list(args), 'kwargs': kwargs or {}}),
+        max_attempts=task.retries + 1,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def execute(job_id):
+    """Выполняет захваченную задачу и записывает результат."""
+    try:
+        current = Job.objects.get(id=job_id)
+        try:
+            task = resolve(current.name)
+            args, kwargs = current.arguments()
+            task.func(*args, **kwargs)
+        except Exception:
+            logger.exception('Фоновая задача %s завершилась ошибкой', current)
+            _failed(current, traceback.format_exc())
+        else:
+            Job.objects.filter(id=job_id).update(
+                status=Job.DONE, finished=timezone.now(), error=''
+            )
+    finally:
+        connections.close_all()
+
+
+def _failed(current, error):
+    jobs = Job.objects.filter(id=current.id)
+    now = timezone.now()
+    try:
+        task = resolve(current.name)
+    except (ImportError, TypeError):
+        # Задачу удалили из кода: повторять бессмысленно.
+        task = None
+    if task is not None and current.attempts < current.max_attempts:
+        delay = task.backoff(current.attempts)
+        jobs.update(
+            status=Job.QUEUED, run_at=now + timedelta(seconds=delay),
+            locked_by='', locked_at=None, error=error
+        )
+    else:
+        jobs.update(status=Job.FAILED, finished=now, error=error)
+
+
+def recover(timeout=None):
+    """Возвращает в очередь запуски упавших воркеров.
+
+    Попытка засчитана при захвате, поэтому задача, исчерпавшая
+    попытки, помечается ошибкой.
+    """
+    if timeout is None:
+        timeout = settings.JOB_LOCK_TIMEOUT
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+    error = 'Воркер не завершил задачу'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished=timezone.now(), error=error
+    )
+    return failed + stale.update(
+        status=Job.QUEUED, locked_by='', locked_at=None, error=error
+    )
+
+
+def schedule():
+    """Ставит в очередь периодические задачи JOB_SCHEDULE.
+
+    Следующий запуск — через интервал после окончания предыдущего;
+    пока запуск в очереди или выполняется, новый не ставится.
+    """
+    for name, interval in settings.JOB_SCHEDULE.items():
+        runs = Job.objects.filter(name=name)
+        with transaction.atomic():
+            if runs.filter(status__in=(Job.QUEUED, Job.RUNNING)).exists():
+                continue
+            last = runs.exclude(finished=None).order_by(
+                '-finished'
+            ).values_list('finished', flat=True).first()
+            run_at = last + timedelta(seconds=interval) if last else None
+            enqueue(resolve(name), run_at=run_at)
+
+
+@job
+def prune_finished():
+    """Удаляет выполненные задачи старше JOB_KEEP_FINISHED секунд."""
+    border = timezone.now() - timedelta(seconds=settings.JOB_KEEP_FINISHED)
+    return Job.objects.filter(
+        status=Job.DONE, finished__lt=border
+    ).delete()[0]
+
+
+def _init_process():
+    # Соединение родителя после fork не переиспользуем.
+    connections.close_all()
+
+
+class Worker:
+    """Забирает задачи из очередей и выполняет их в пуле.
+
+    queues — {очередь: сколько её задач может выполняться сразу}.
+    """
+
+    def __init__(self, queues=None, processes=False, poll_interval=None):
+        self.queues = dict(queues or settings.JOB_QUEUES)
+        self.poll_interval = (
+            settings.JOB_POLL_INTERVAL if poll_interval is None
+            else poll_interval
+        )
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        size = sum(self.queues.values())
+        if processes:
+            self.pool = ProcessPoolExecutor(size, initializer=_init_process)
+        else:
+            self.pool = ThreadPoolExecutor(size, thread_name_prefix='job')
+        self.futures = set()
+        self.stopping = False
+
+    def claim(self, queue, limit):
+        """Захватывает до limit готовых задач очереди."""
+        now = timezone.now()
+        running = Job.objects.filter(queue=queue, status=Job.RUNNING).count()
+        candidates = Job.objects.filter(
+            queue=queue, status=Job.QUEUED, run_at__lte=now
+        ).order_by('run_at', 'id').values_list('id', flat=True)
+        claimed = []
+        for job_id in candidates[:max(limit - running, 0)]:
+            # Условный UPDATE: задачу получит только один из воркеров.
+            if Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_by=self.worker_id, locked_at=now,
+                attempts=F('attempts') + 1
+            ):
+                claimed.append(job_id)
+        return claimed
+
+    def tick(self):
+        """Один проход: восстановление, расписание, запуск задач.
+
+        Возвращает число запущенных задач.
+        """
+        self.futures = {future for future in self.futures
+                        if not future.done()}
+        recover()
+        schedule()
+        started = 0
+        for queue, limit in self.queues.items():
+            for job_id in self.claim(queue, limit):
+                self.futures.add(self.pool.submit(execute, job_id))
+                started += 1
+        return started
+
+    def run(self, burst=False):
+        """Работает до stop(); с burst — пока в очередях есть задачи."""
+        try:
+            while not self.stopping:
+                started = self.tick()
+                if burst and not started and not self.futures:
+                    break
+                if not started:
+                    time.sleep(self.poll_interval)
+        finally:
+            self.pool.shutdown(wait=True)
+            connections.close_all()
+
+    def stop(self):
+        self.stopping = True
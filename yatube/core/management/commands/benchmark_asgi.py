@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import ASGIHandler, Response, build_environ
+
+
+def scope_for(path):
+    path, _, query = path.partition('?')
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI-пула потоков и '
+        'ASGI-приложения при многих одновременных медленных клиентах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Адрес страницы; можно несколько, по умолчанию «/».'
+        )
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--concurrency', type=int, default=100,
+            help='Сколько клиентов ждут ответа одновременно.'
+        )
+        parser.add_argument(
+            '--threads', type=int,
+            help='Потоков у обоих серверов; по умолчанию ASGI_THREADS.'
+        )
+        parser.add_argument(
+            '--client-delay', type=float, default=50,
+            help='Сколько миллисекунд клиент читает ответ.'
+        )
+
+    def handle(self, *args, paths, requests, concurrency, threads,
+               client_delay, **options):
+        if requests < 2 or concurrency < 1:
+            raise CommandError('Нужно хотя бы два запроса и один клиент')
+        threads = threads or settings.ASGI_THREADS
+        self.paths = paths or ['/']
+        self.delay = client_delay / 1000
+        self.wsgi_application = get_wsgi_application()
+        executor = ThreadPoolExecutor(max_workers=threads)
+        handler = ASGIHandler(self.wsgi_application, threads)
+        for name, serve, target in (
+            ('WSGI', self.wsgi, executor), ('ASGI', self.asgi, handler),
+        ):
+            self.report(name, *asyncio.run(
+                self.run(serve, target, requests, concurrency)
+            ))
+        executor.shutdown()
+        handler.shutdown()
+
+    async def wsgi(self, executor, path):
+        """Поток WSGI-сервера занят и пока клиент читает ответ."""
+        def serve():
+            environ = build_environ(scope_for(path), BytesIO())
+            response = Response()
+            iterable = self.wsgi_application(
+                environ, response.start_response
+            )
+            try:
+                for chunk in iterable:
+                    pass
+                time.sleep(self.delay)
+            finally:
+                iterable.close()
+            return response.status
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, serve
+        )
+
+    async def asgi(self, handler, path):
+        status = None
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b''}
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif not message.get('more_body', False):
+                await asyncio.sleep(self.delay)
+
+        await handler(scope_for(path), receive, send)
+        return status
+
+    async def run(self, serve, target, requests, concurrency):
+        paths = itertools.islice(itertools.cycle(self.paths), requests)
+        latencies = []
+        errors = 0
+
+        async def client():
+            nonlocal errors
+            for path in paths:
+                start = time.perf_counter()
+                status = await serve(target, path)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - start, latencies, errors
+
+    def report(self, name, elapsed, latencies, errors):
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{name}: {len(latencies) / elapsed:.0f} запросов/с, '
+            f'задержка p50 {percentiles[49] * 1000:.0f} мс, '
+            f'p99 {percentiles[98] * 1000:.0f} мс, ошибок: {errors}'
+        )
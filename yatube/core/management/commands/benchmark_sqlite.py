@@ -0,0 +1,163 @@
+import functools
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.test.utils import override_settings
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает чтение лент при одновременной записи комментариев '
+        'и постов на копии базы: SQLite по умолчанию и SQLITE_PRAGMAS. '
+        'Запускать с --settings yatube.settings_production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument(
+            '--duration', type=float, default=5,
+            help='Секунд на каждый вариант.'
+        )
+
+    def handle(self, *args, writers, readers, duration, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Сравнение имеет смысл только для SQLite')
+        if not settings.SQLITE_PRAGMAS:
+            raise CommandError(
+                'SQLITE_PRAGMAS пусты: запустите с '
+                '--settings yatube.settings_production'
+            )
+        source = connection.settings_dict['NAME']
+        directory = tempfile.mkdtemp()
+        try:
+            for name, pragmas in (
+                ('по умолчанию', {}), ('SQLITE_PRAGMAS', None),
+            ):
+                path = self.copy(source, os.path.join(directory, 'db'))
+                overrides = {'BACKGROUND_TASKS_EAGER': True}
+                if pragmas is not None:
+                    overrides['SQLITE_PRAGMAS'] = pragmas
+                with override_settings(**overrides):
+                    result = self.measure(path, writers, readers, duration)
+                self.report(name, duration, *result)
+        finally:
+            connection.settings_dict['NAME'] = source
+            connection.close()
+            shutil.rmtree(directory)
+
+    def copy(self, source, path):
+        """Копия базы в режиме журнала по умолчанию."""
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        with sqlite3.connect(source) as original, \
+                sqlite3.connect(path) as target:
+            original.backup(target)
+        with sqlite3.connect(path) as target:
+            target.execute('PRAGMA journal_mode = DELETE')
+        return path
+
+    def measure(self, path, writers, readers, duration):
+        # Новые соединения всех потоков открываются по этому словарю,
+        # поэтому сигналы и ORM пишут в копию, а не в рабочую базу.
+        connection.close()
+        connection.settings_dict['NAME'] = path
+        user_ids, post_ids = self.sample_ids()
+        connection.close()
+        deadline = time.monotonic() + duration
+        reads, writes, errors = [], [], []
+        write = functools.partial(self.write, user_ids, post_ids)
+        read = functools.partial(self.read, post_ids)
+        threads = [
+            threading.Thread(
+                target=self.repeat, args=(write, deadline, writes, errors)
+            )
+            for _ in range(writers)
+        ] + [
+            threading.Thread(
+                target=self.repeat, args=(read, deadline, reads, errors)
+            )
+            for _ in range(readers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return reads, writes, len(errors)
+
+    def sample_ids(self):
+        """До сотни пользователей и постов копии; пустую дополняет."""
+        user_ids = list(User.objects.values_list('id', flat=True)[:100])
+        if not user_ids:
+            user_ids = [User.objects.create_user('benchmark').id]
+        post_ids = list(Post.objects.values_list('id', flat=True)[:100])
+        if not post_ids:
+            post_ids = [
+                Post.objects.create(author_id=user_ids[0], text='Пост').id
+            ]
+        return user_ids, post_ids
+
+    def repeat(self, operation, deadline, latencies, errors):
+        """Повторяет operation до deadline, копя задержки и ошибки."""
+        try:
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    operation()
+                except OperationalError:
+                    errors.append(1)
+                    continue
+                latencies.append(time.perf_counter() - start)
+        finally:
+            connections.close_all()
+
+    def write(self, user_ids, post_ids):
+        with transaction.atomic():
+            if random.random() < 0.1:
+                Post.objects.create(
+                    author_id=random.choice(user_ids),
+                    text='Пост из бенчмарка'
+                )
+            else:
+                Comment.objects.create(
+                    post_id=random.choice(post_ids),
+                    author_id=random.choice(user_ids),
+                    text='Комментарий из бенчмарка'
+                )
+
+    def read(self, post_ids):
+        list(Post.objects.select_related(
+            'author', 'group'
+        ).order_by('-pub_date', '-id')[:10])
+        list(Comment.objects.filter(
+            post_id=random.choice(post_ids)
+        ).select_related('author')[:50])
+
+    def report(self, name, duration, reads, writes, errors):
+        def p99(latencies):
+            if len(latencies) < 2:
+                return 0
+            return statistics.quantiles(latencies, n=100)[98] * 1000
+
+        self.stdout.write(
+            f'{name}: чтений {len(reads) / duration:.0f}/с '
+            f'(p99 {p99(reads):.1f} мс), '
+            f'записей {len(writes) / duration:.0f}/с '
+            f'(p99 {p99(writes):.1f} мс), '
+            f'ошибок блокировки: {errors}'
+        )
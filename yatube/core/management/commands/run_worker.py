@@ -0,0 +1,61 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из таблицы Job: повторы, периодические '
+        'задачи и ограничение одновременных задач по очередям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', action='append', dest='queues', metavar='NAME[:N]',
+            help='Очередь и её предел; по умолчанию все из JOB_QUEUES.'
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Пул процессов вместо пула потоков.'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда готовых задач не останется.'
+        )
+
+    def parse_queues(self, values):
+        queues = {}
+        for value in values:
+            name, _, limit = value.partition(':')
+            if limit:
+                if not limit.isdigit() or not int(limit):
+                    raise CommandError(f'Неверный предел очереди: {value}')
+                queues[name] = int(limit)
+            elif name in settings.JOB_QUEUES:
+                queues[name] = settings.JOB_QUEUES[name]
+            else:
+                raise CommandError(f'Неизвестная очередь: {name}')
+        return queues
+
+    def handle(self, *args, queues, processes, burst, **options):
+        worker = Worker(
+            self.parse_queues(queues) if queues else None, processes
+        )
+        # Задачи в работе доделываются, новые не берутся.
+        previous = {
+            signum: signal.signal(signum, lambda *_: worker.stop())
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        self.stdout.write(
+            'Очереди: ' + ', '.join(
+                f'{name}:{limit}' for name, limit in worker.queues.items()
+            )
+        )
+        try:
+            worker.run(burst=burst)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
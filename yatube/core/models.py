@@ -0,0 +1,53 @@
+import json
+
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди BACKGROUND_TASKS_DURABLE.
+
+    name — путь к функции с @job, аргументы хранятся в JSON.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    queue = models.CharField('Очередь', max_length=50, default='default')
+    payload = models.TextField(default='{"args": [], "kwargs": {}}')
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    run_at = models.DateTimeField('Запуск не раньше', default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Выборка воркера: готовые к запуску задачи очереди.
+            models.Index(
+                fields=['status', 'queue', 'run_at'],
+                name='job_status_queue_run_idx'
+            ),
+            models.Index(fields=['name', 'status'], name='job_name_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
+
+    def arguments(self):
+        data = json.loads(self.payload)
+        return data['args'], data['kwargs']
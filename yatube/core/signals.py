@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Прагмы SQLITE_PRAGMAS для каждого нового соединения SQLite.
+
+    Прагмы вроде synchronous и cache_size действуют только на своё
+    соединение, поэтому задаются при каждом подключении; с
+    CONN_MAX_AGE это происходит редко.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase, TransactionTestCase
+
+from posts.models import Post
+
+from ..asgi import ASGIHandler
+
+User = get_user_model()
+
+
+def scope_for(path, method='GET', query=b'', headers=()):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query,
+        'headers': list(headers),
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+async def request(handler, scope, body=(b'',), disconnect_after=None):
+    """Выполняет запрос; возвращает статус, заголовки и куски тела."""
+    messages = [
+        {'type': 'http.request', 'body': chunk,
+         'more_body': number < len(body) - 1}
+        for number, chunk in enumerate(body)
+    ]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        chunks = [m for m in sent if m['type'] == 'http.response.body']
+        while disconnect_after is None or len(chunks) < disconnect_after:
+            await asyncio.sleep(0.01)
+            chunks = [
+                m for m in sent if m['type'] == 'http.response.body'
+            ]
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await handler(scope, receive, send)
+    start = sent[0]
+    return (
+        start['status'], dict(start['headers']),
+        [message['body'] for message in sent[1:]],
+    )
+
+
+def call(handler, scope, body=(b'',), disconnect_after=None):
+    return asyncio.run(request(handler, scope, body, disconnect_after))
+
+
+class AdapterTests(SimpleTestCase):
+    def setUp(self):
+        self.closed = []
+        self.threads = set()
+        self.waiting = threading.Event()
+        self.held = threading.Event()
+        self.handler = ASGIHandler(self.application, 2)
+        self.addCleanup(self.handler.shutdown)
+
+    def application(self, environ, start_response):
+        self.threads.add(threading.get_ident())
+        self.environ = environ
+        self.body = environ['wsgi.input'].read()
+        start_response('201 Created', [('X-Test', 'ok')])
+        if environ['PATH_INFO'] in ('/stream/', '/slow/', '/held/'):
+            return self.stream(environ['PATH_INFO'])
+        return [b'one', b'two']
+
+    def stream(self, path):
+        test = self
+
+        class Streaming:
+            streaming = True
+
+            def __iter__(self):
+                for number in range(100):
+                    if path == '/slow/':
+                        time.sleep(0.01)
+                    elif path == '/held/':
+                        # Как поток событий, ждущий новых записей.
+                        test.waiting.set()
+                        test.held.wait(5)
+                    yield str(number).encode()
+
+            def close(self):
+                test.closed.append(True)
+
+        return Streaming()
+
+    def test_environ_and_response(self):
+        status, headers, chunks = call(
+            self.handler,
+            scope_for(
+                '/путь/', 'POST', b'a=1',
+                [(b'content-type', b'text/plain'), (b'accept', b'a'),
+                 (b'accept', b'b')]
+            ),
+            body=(b'first ', b'second'),
+        )
+        self.assertEqual(status, 201)
+        self.assertEqual(headers[b'x-test'], b'ok')
+        self.assertEqual(chunks, [b'onetwo'])
+        self.assertEqual(self.body, b'first second')
+        environ = self.environ
+        self.assertEqual(environ['REQUEST_METHOD'], 'POST')
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/путь/'
+        )
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'a,b')
+        self.assertEqual(environ['REMOTE_ADDR'], '127.0.0.1')
+        self.assertNotIn(threading.get_ident(), self.threads)
+
+    def test_streaming(self):
+        status, headers, chunks = call(self.handler, scope_for('/stream/'))
+        self.assertEqual(b''.join(chunks), b''.join(
+            str(number).encode() for number in range(100)
+        ))
+        self.assertEqual(self.closed, [True])
+
+    def test_disconnect_stops_streaming(self):
+        status, headers, chunks = call(
+            self.handler, scope_for('/slow/'), disconnect_after=3
+        )
+        self.assertLess(len(chunks), 100)
+        self.assertEqual(self.closed, [True])
+
+    def test_open_stream_does_not_block_requests(self):
+        handler = ASGIHandler(self.application, 1, 1)
+        self.addCleanup(handler.shutdown)
+
+        async def requests():
+            stream = asyncio.ensure_future(
+                request(handler, scope_for('/held/'))
+            )
+            try:
+                while not self.waiting.is_set():
+                    await asyncio.sleep(0.01)
+                return await asyncio.wait_for(
+                    request(handler, scope_for('/')), 2
+                )
+            finally:
+                self.held.set()
+                await stream
+
+        status, headers, chunks = asyncio.run(requests())
+        self.assertEqual(chunks, [b'onetwo'])
+
+    def test_lifespan(self):
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.handler({'type': 'lifespan'}, receive, send))
+        self.assertEqual(
+            sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
+
+
+class DjangoTests(TransactionTestCase):
+    def test_pages(self):
+        author = User.objects.create_user(username='leo')
+        post = Post.objects.create(author=author, text='Пост через ASGI')
+        handler = ASGIHandler(get_wsgi_application(), 2)
+        self.addCleanup(handler.shutdown)
+        host = [(b'host', b'localhost')]
+        for path in ('/', f'/posts/{post.id}/', '/profile/leo/'):
+            with self.subTest(path=path):
+                status, headers, chunks = call(
+                    handler, scope_for(path, headers=host)
+                )
+                self.assertEqual(status, 200)
+                self.assertIn('Пост через ASGI', b''.join(chunks).decode())
+        status, headers, chunks = call(
+            handler, scope_for('/profile/nobody/', headers=host)
+        )
+        self.assertEqual(status, 404)
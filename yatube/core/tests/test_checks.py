@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import check_durable_jobs_cache
+
+LOCAL_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+FILE_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/yatube-cache',
+    }
+}
+
+
+class DurableJobsCacheCheckTests(SimpleTestCase):
+    def test_durable_jobs_need_shared_cache(self):
+        cases = (
+            (LOCAL_CACHE, True, ['core.E001']),
+            (LOCAL_CACHE, False, []),
+            (FILE_CACHE, True, []),
+        )
+        for caches, durable, expected in cases:
+            with self.subTest(caches=caches, durable=durable):
+                with override_settings(
+                    CACHES=caches, BACKGROUND_TASKS_DURABLE=durable
+                ):
+                    errors = check_durable_jobs_cache(None)
+                self.assertEqual([error.id for error in errors], expected)
@@ -0,0 +1,186 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .. import background, jobs
+from ..models import Job
+
+CALLS = []
+
+
+@jobs.job
+def record(*args, **kwargs):
+    CALLS.append((args, kwargs))
+
+
+@jobs.job(retries=2, retry_delay=0)
+def flaky():
+    CALLS.append('flaky')
+    if len(CALLS) < 2:
+        raise ValueError('Первая попытка')
+
+
+@jobs.job(queue='other', retries=1, retry_delay=0)
+def broken():
+    CALLS.append('broken')
+    raise ValueError('Всегда')
+
+
+@override_settings(
+    BACKGROUND_TASKS_DURABLE=True,
+    JOB_QUEUES={'default': 2, 'other': 1},
+    JOB_SCHEDULE={},
+    JOB_POLL_INTERVAL=0.01,
+)
+class JobTests(TransactionTestCase):
+
+    def setUp(self):
+        CALLS.clear()
+
+    def work(self, **kwargs):
+        jobs.Worker(**kwargs).run(burst=True)
+
+    def test_delay_is_stored_and_run_by_worker(self):
+        job = record.delay(1, 'два', key=[3])
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.name, 'core.tests.test_jobs.record')
+        self.assertEqual(CALLS, [])
+        self.work()
+        self.assertEqual(CALLS, [((1, 'два'), {'key': [3]})])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished)
+
+    def test_failed_job_is_retried(self):
+        job = flaky.delay()
+        self.work()
+        job.refresh_from_db()
+        self.assertEqual(CALLS, ['flaky', 'flaky'])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 2)
+
+    def test_job_fails_after_last_attempt(self):
+        job = broken.delay()
+        self.work()
+        job.refresh_from_db()
+        self.assertEqual(CALLS, ['broken', 'broken'])
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('ValueError: Всегда', job.error)
+
+    def test_retry_waits_for_backoff(self):
+        task = jobs.Task(broken.func, retries=3, retry_delay=60)
+        self.assertEqual(
+            [task.backoff(attempt) for attempt in (1, 2, 3)], [60, 120, 240]
+        )
+
+    def test_queue_limit_counts_running_jobs(self):
+        for _ in range(3):
+            record.delay()
+        Job.objects.create(
+            name=record.name, status=Job.RUNNING, locked_at=timezone.now()
+        )
+        worker = jobs.Worker()
+        self.assertEqual(len(worker.claim('default', 2)), 1)
+        self.assertEqual(worker.claim('default', 2), [])
+        worker.pool.shutdown()
+
+    def test_worker_serves_only_its_queues(self):
+        other = broken.delay()
+        record.delay()
+        self.work(queues={'default': 1})
+        other.refresh_from_db()
+        self.assertEqual(other.status, Job.QUEUED)
+        self.assertEqual(len(CALLS), 1)
+
+    def test_recover_abandoned_jobs(self):
+        old = timezone.now() - timedelta(hours=1)
+        retried = Job.objects.create(
+            name=record.name, status=Job.RUNNING, locked_at=old,
+            attempts=1, max_attempts=2
+        )
+        exhausted = Job.objects.create(
+            name=record.name, status=Job.RUNNING, locked_at=old,
+            attempts=1, max_attempts=1
+        )
+        fresh = Job.objects.create(
+            name=record.name, status=Job.RUNNING, locked_at=timezone.now()
+        )
+        self.assertEqual(jobs.recover(timeout=60), 2)
+        for job, status in (
+            (retried, Job.QUEUED),
+            (exhausted, Job.FAILED),
+            (fresh, Job.RUNNING),
+        ):
+            job.refresh_from_db()
+            self.assertEqual(job.status, status)
+
+    @override_settings(JOB_SCHEDULE={'core.tests.test_jobs.record': 60})
+    def test_schedule(self):
+        jobs.schedule()
+        jobs.schedule()
+        job = Job.objects.get()
+        self.assertLessEqual(job.run_at, timezone.now())
+        # Следующий запуск воркер ставит сам, через интервал.
+        self.work()
+        self.assertEqual(len(CALLS), 1)
+        done = Job.objects.get(status=Job.DONE)
+        following = Job.objects.get(status=Job.QUEUED)
+        self.assertEqual(
+            following.run_at, done.finished + timedelta(seconds=60)
+        )
+
+    def test_run_worker_command(self):
+        record.delay()
+        broken.delay()
+        out = StringIO()
+        call_command('run_worker', queues=['default:1'], burst=True,
+                     stdout=out)
+        self.assertIn('Очереди: default:1', out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 1)
+
+    def test_prune_finished(self):
+        old = timezone.now() - timedelta(days=30)
+        Job.objects.create(name=record.name, status=Job.DONE, finished=old)
+        Job.objects.create(name=record.name, status=Job.FAILED, finished=old)
+        Job.objects.create(
+            name=record.name, status=Job.DONE, finished=timezone.now()
+        )
+        self.assertEqual(jobs.prune_finished(), 1)
+
+
+@override_settings(BACKGROUND_TASKS_DURABLE=False)
+class InProcessJobTests(TransactionTestCase):
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delay_uses_thread_pool(self):
+        with mock.patch('core.background.submit') as submit:
+            record.delay(1)
+        submit.assert_called_once_with(record.run_with_retries, 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_retries_in_process(self):
+        with mock.patch('core.background.submit_later') as later:
+            flaky.run_with_retries()
+        # Поток пула не спит до повтора, а освобождается.
+        self.assertEqual(CALLS, ['flaky'])
+        later.assert_called_once_with(0, flaky.attempt, 2, (), {})
+        flaky.attempt(2, (), {})
+        self.assertEqual(CALLS, ['flaky', 'flaky'])
+
+    def test_submit_later(self):
+        done = threading.Event()
+        background.submit_later(0.01, done.set)
+        self.assertTrue(done.wait(5))
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_eager(self):
+        record.delay(1)
+        self.assertEqual(CALLS, [((1,), {})])
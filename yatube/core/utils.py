@@ -0,0 +1,12 @@
+"""Общие помощники приложений проекта."""
+from itertools import islice
+
+
+def chunks(iterable, size):
+    """Списки по size элементов из итерируемого объекта, без его копии."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
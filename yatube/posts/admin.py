@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Group, Post, Follow
 
 
@@ -10,6 +11,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по FTS-индексу вместо LIKE '%...%' по всей таблице.
+        if search.match_expression(search_term) is None:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return search.search_posts(search_term, queryset), False
+
 
 class GroupsAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'discription')
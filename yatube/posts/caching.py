@@ -0,0 +1,201 @@
+"""Ключи кэша лент и их инвалидация.
+
+Лента определяется областью (scope): вся лента, группа, автор, пост
+или подписки пользователя. Счётчики постов по областям сбрасываются
+сигналами создания и удаления постов, а версии областей, входящие
+в ключи фрагментов шаблонов и страниц, сдвигаются при любом изменении
+поста, новом комментарии, правке группы или имени пользователя.
+
+Сдвиг версии виден другим процессам только через общий кэш. С кэшем
+в памяти процесса версии живут FEED_VERSION_TIMEOUT секунд: это
+предел устаревания страницы, собранной в другом процессе.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Comment, Group, Post, User
+
+CURSOR_PARAM = 'cursor'
+COMMENTS_CURSOR_PARAM = 'comments'
+INDEX = 'index'
+FOLLOW_GENERATION_KEY = 'post_count:follow_generation'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def post_scopes(post, group_id=None):
+    """Области лент, в которые попадает пост, и страница самого поста."""
+    scopes = [INDEX, author_scope(post.author_id), post_scope(post.pk)]
+    for value in {post.group_id, group_id} - {None}:
+        scopes.append(group_scope(value))
+    return scopes
+
+
+def group_scopes(group_id):
+    """Области страниц, где видно название и адрес группы."""
+    authors = Post.objects.filter(group_id=group_id).order_by().values_list(
+        'author_id', flat=True
+    ).distinct()
+    scopes = [INDEX, group_scope(group_id)]
+    return scopes + [author_scope(author_id) for author_id in authors]
+
+
+def user_scopes(user_id):
+    """Области страниц, где видно имя пользователя."""
+    groups = Post.objects.filter(author_id=user_id).exclude(
+        group=None
+    ).order_by().values_list('group_id', flat=True).distinct()
+    commented = Comment.objects.filter(author_id=user_id).order_by(
+    ).values_list('post_id', flat=True).distinct()
+    scopes = [INDEX, author_scope(user_id)]
+    scopes += [group_scope(group_id) for group_id in groups]
+    return scopes + [post_scope(post_id) for post_id in commented]
+
+
+def count_key(scope):
+    return f'post_count:{scope}'
+
+
+def follow_generation():
+    return cache.get_or_set(FOLLOW_GENERATION_KEY, 0, None)
+
+
+def follow_count_key(user_id, generation=None):
+    """Ключ счётчика ленты подписок.
+
+    В ключ входит поколение: его сдвиг разом сбрасывает счётчики
+    всех лент подписок, не перебирая подписчиков автора.
+    """
+    if generation is None:
+        generation = follow_generation()
+    return f'post_count:follow:{user_id}:{generation}'
+
+
+def invalidate_counts(scopes):
+    cache.delete_many([count_key(scope) for scope in scopes])
+
+
+def invalidate_follow_counts(user_ids=None):
+    """Сбрасывает счётчики лент подписок пользователей или всех сразу."""
+    if user_ids is None:
+        try:
+            cache.incr(FOLLOW_GENERATION_KEY)
+        except ValueError:
+            cache.set(FOLLOW_GENERATION_KEY, 1, None)
+        return
+    generation = follow_generation()
+    cache.delete_many([
+        follow_count_key(user_id, generation) for user_id in user_ids
+    ])
+
+
+def version_key(scope):
+    return f'feed_version:{scope}'
+
+
+def _new_version():
+    # Версия — время изменения в наносекундах: она же служит
+    # Last-Modified страницы, а после вытеснения ключа из кэша
+    # старые фрагменты не оживут под той же версией.
+    return time.time_ns()
+
+
+def feed_version(scope):
+    return cache.get_or_set(
+        version_key(scope), _new_version, settings.FEED_VERSION_TIMEOUT
+    )
+
+
+def feed_versions(scopes):
+    """Версии нескольких областей за одно обращение к кэшу."""
+    keys = [version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, settings.FEED_VERSION_TIMEOUT)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump_versions(scopes):
+    version = _new_version()
+    cache.set_many(
+        {version_key(scope): version for scope in scopes},
+        settings.FEED_VERSION_TIMEOUT
+    )
+
+
+def page_etag(versions):
+    digest = hashlib.md5(
+        ':'.join(str(version) for version in versions).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def page_key(path, etag):
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f'anonymous_page:{digest}:{etag.strip(chr(34))}'
+
+
+def fragment_context(request, page_obj, scope):
+    """Переменные для {% cache %} ленты: страница или курсор и версия."""
+    cursor = request.GET.get(CURSOR_PARAM)
+    # Без ?cursor= лента с оценённым числом постов тоже курсорная.
+    if hasattr(page_obj, 'number'):
+        page_key = f'page:{page_obj.number}'
+    else:
+        page_key = f'cursor:{cursor or ""}'
+    return {
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'feed_version': feed_version(scope),
+        'feed_page': page_key,
+    }
+
+
+def index_page_scopes():
+    return [INDEX]
+
+
+def group_page_scopes(slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [group_scope(group_id)]
+
+
+def profile_page_scopes(username):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [author_scope(author_id)]
+
+
+def post_page_scopes(post_id):
+    # Страница поста показывает и число постов автора, и группу.
+    saved = Post.objects.filter(id=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if saved is None:
+        return None
+    author_id, group_id = saved
+    scopes = [post_scope(post_id), author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
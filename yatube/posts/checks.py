@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from core.checks import process_local_cache
+
+
+@register()
+def check_feed_version_cache(app_configs, **kwargs):
+    """Бессрочные версии лент требуют общего для процессов кэша."""
+    if settings.FEED_VERSION_TIMEOUT is None and process_local_cache():
+        return [Error(
+            'Версии лент хранятся бессрочно в кэше процесса: запись '
+            'в одном процессе не сбросит страницы других.',
+            hint='Настройте общий кэш (файловый, БД) или задайте '
+                 'FEED_VERSION_TIMEOUT в секундах.',
+            id='posts.E001',
+        )]
+    return []
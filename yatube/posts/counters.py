@@ -0,0 +1,161 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Счётчики сдвигаются выражениями F() в той же транзакции, что и
+изменение строки, поэтому параллельные запросы не теряют обновлений.
+Функции recount_* пересчитывают их пачками по исходным таблицам.
+"""
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from core.jobs import job
+
+from .models import Comment, Follow, Group, Post, User, UserCounter
+
+
+def user_counter(user, field):
+    """Значение счётчика пользователя; строки может ещё не быть."""
+    counter = getattr(user, 'counters', None)
+    return getattr(counter, field) if counter is not None else 0
+
+
+def _shift(queryset, field, delta):
+    value = F(field) + delta
+    if delta < 0:
+        # Счётчик мог отстать от таблицы (bulk_create, update(),
+        # прерванный импорт): ниже нуля его не даёт опустить CHECK.
+        value = Greatest(value, 0)
+    return queryset.update(**{field: value})
+
+
+def shift_user(user_id, field, delta):
+    counters = UserCounter.objects.filter(user_id=user_id)
+    # Строку создаём только на увеличение: уменьшать у отсутствующей
+    # нечего, а при каскадном удалении пользователя её создавать нельзя.
+    if not _shift(counters, field, delta) and delta > 0:
+        UserCounter.objects.get_or_create(user_id=user_id)
+        _shift(counters, field, delta)
+
+
+def shift_group(group_id, delta):
+    if group_id is not None:
+        _shift(Group.objects.filter(id=group_id), 'posts_count', delta)
+
+
+def shift_post_comments(post_id, delta):
+    _shift(Post.objects.filter(id=post_id), 'comments_count', delta)
+
+
+def post_created(post):
+    shift_user(post.author_id, 'posts_count', 1)
+    shift_group(post.group_id, 1)
+
+
+def post_moved(old_group_id, new_group_id):
+    if old_group_id != new_group_id:
+        shift_group(old_group_id, -1)
+        shift_group(new_group_id, 1)
+
+
+def post_deleted(post):
+    shift_user(post.author_id, 'posts_count', -1)
+    shift_group(post.group_id, -1)
+
+
+def follow_changed(follow, delta):
+    shift_user(follow.author_id, 'followers_count', delta)
+    shift_user(follow.user_id, 'following_count', delta)
+
+
+def _counts(queryset, key, ids):
+    return dict(
+        queryset.filter(**{f'{key}__in': ids}).values(key).annotate(
+            total=Count('id')
+        ).order_by().values_list(key, 'total')
+    )
+
+
+def _batches(queryset, batch_size):
+    ids = queryset.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        batch = list(ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def _scope(queryset, ids):
+    return queryset if ids is None else queryset.filter(id__in=ids)
+
+
+def recount_users(batch_size, ids=None):
+    """Пересчитывает UserCounter, возвращает число исправленных строк.
+
+    ids ограничивает пересчёт этими пользователями.
+    """
+    fixed = 0
+    for batch in _batches(_scope(User.objects.all(), ids), batch_size):
+        posts = _counts(Post.objects, 'author_id', batch)
+        followers = _counts(Follow.objects, 'author_id', batch)
+        following = _counts(Follow.objects, 'user_id', batch)
+        existing = UserCounter.objects.in_bulk(batch, field_name='user_id')
+        changed = []
+        created = []
+        for user_id in batch:
+            actual = {
+                'posts_count': posts.get(user_id, 0),
+                'followers_count': followers.get(user_id, 0),
+                'following_count': following.get(user_id, 0),
+            }
+            counter = existing.get(user_id)
+            if counter is None:
+                created.append(UserCounter(user_id=user_id, **actual))
+                continue
+            if any(getattr(counter, k) != v for k, v in actual.items()):
+                for name, value in actual.items():
+                    setattr(counter, name, value)
+                changed.append(counter)
+        UserCounter.objects.bulk_create(created)
+        UserCounter.objects.bulk_update(
+            changed, ['posts_count', 'followers_count', 'following_count']
+        )
+        fixed += len(created) + len(changed)
+    return fixed
+
+
+def _recount_field(model, field, source, key, batch_size, ids=None):
+    fixed = 0
+    for batch in _batches(_scope(model.objects.all(), ids), batch_size):
+        actual = _counts(source, key, batch)
+        changed = []
+        for obj in model.objects.filter(id__in=batch).only('id', field):
+            value = actual.get(obj.id, 0)
+            if getattr(obj, field) != value:
+                setattr(obj, field, value)
+                changed.append(obj)
+        model.objects.bulk_update(changed, [field])
+        fixed += len(changed)
+    return fixed
+
+
+def recount_groups(batch_size, ids=None):
+    return _recount_field(
+        Group, 'posts_count', Post.objects, 'group_id', batch_size, ids
+    )
+
+
+def recount_posts(batch_size, ids=None):
+    return _recount_field(
+        Post, 'comments_count', Comment.objects, 'post_id', batch_size, ids
+    )
+
+
+@job
+def repair(batch_size=1000):
+    """Периодическая сверка всех счётчиков с исходными таблицами."""
+    return (
+        recount_users(batch_size)
+        + recount_groups(batch_size)
+        + recount_posts(batch_size)
+    )
@@ -0,0 +1,69 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from . import caching
+
+
+def cached_page(request, scopes, render, vary_cookie=False):
+    """Ответ, зависящий только от областей scopes.
+
+    ETag и Last-Modified считаются по версиям областей: совпавшая
+    проверка браузера получает 304, иначе ответ берётся из кэша или
+    собирается вызовом render() и кэшируется, если он успешен
+    и не ставит cookies.
+    """
+    versions = caching.feed_versions(scopes)
+    etag = caching.page_etag(versions)
+    last_modified = max(versions) // 10 ** 9
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        response['ETag'] = etag
+        return response
+    key = caching.page_key(request.get_full_path(), etag)
+    response = cache.get(key)
+    if response is None:
+        response = render()
+        if response.status_code != 200 or response.cookies:
+            return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        if vary_cookie:
+            patch_vary_headers(response, ('Cookie',))
+        cache.set(key, response, settings.ANONYMOUS_PAGE_CACHE_TIMEOUT)
+    return response
+
+
+def anonymous_page_cache(scopes_func, anonymous_only=True):
+    """Кэширует страницу целиком для анонимных посетителей.
+
+    scopes_func получает аргументы view и возвращает области лент,
+    от которых зависит страница, или None, если страницы нет. ETag
+    и Last-Modified считаются по версиям областей без обращения
+    к постам, поэтому повторная проверка кэша браузером или
+    поисковым роботом получает 304 без рендеринга. Авторизованные
+    пользователи видят свою шапку и переключатель лент, им страница
+    всегда собирается заново. Ответы, одинаковые для всех (RSS и
+    Atom), кэшируются с anonymous_only=False.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or (
+                anonymous_only and request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            scopes = scopes_func(*args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            return cached_page(
+                request, scopes, lambda: view(request, *args, **kwargs),
+                vary_cookie=anonymous_only
+            )
+        return wrapper
+    return decorator
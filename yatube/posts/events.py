@@ -0,0 +1,260 @@
+"""Поток событий о новых постах и комментариях (Server-Sent Events).
+
+Сигналы пишут события в журнал ChangeEvent в транзакции изменения.
+Журнал читает один брокер на процесс: соединения ждут на общем
+Condition, и раз в EVENTS_POLL_INTERVAL один из ждущих забирает новые
+строки одним запросом и будит остальных. Поэтому число запросов
+к базе не зависит от числа открытых потоков. Последние
+EVENTS_BUFFER_SIZE событий лежат в памяти; клиент, вернувшийся
+с более старым Last-Event-ID, дочитывает пропущенное из журнала.
+
+Каждое соединение занимает поток сервера, поэтому живёт не дольше
+EVENTS_STREAM_DURATION, а браузер переподключается сам. Открытых
+потоков в процессе не больше EVENTS_MAX_STREAMS: остальные клиенты
+получают 503, и страницы подписываются, только если читатель
+попросил.
+"""
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.jobs import job
+
+from . import caching
+from .models import ChangeEvent
+
+Event = namedtuple('Event', 'id name scopes data')
+# Клиент отстал больше, чем хранит журнал: ему проще перезагрузить
+# страницу, чем дочитывать.
+RESET = 'reset'
+
+
+def record_post(post):
+    ChangeEvent.objects.create(
+        kind=ChangeEvent.POST, post_id=post.id, author_id=post.author_id,
+        group_id=post.group_id
+    )
+
+
+def record_comment(comment):
+    ChangeEvent.objects.create(
+        kind=ChangeEvent.COMMENT, post_id=comment.post_id,
+        author_id=comment.author_id, comment_id=comment.id
+    )
+
+
+def to_event(row):
+    url = reverse('posts:post_detail', args=[row.post_id])
+    if row.kind == ChangeEvent.COMMENT:
+        scopes = {caching.post_scope(row.post_id)}
+        data = {'post': row.post_id, 'comment': row.comment_id, 'url': url}
+    else:
+        scopes = {caching.INDEX, caching.author_scope(row.author_id)}
+        if row.group_id is not None:
+            scopes.add(caching.group_scope(row.group_id))
+        data = {
+            'post': row.post_id, 'author': row.author_id,
+            'group': row.group_id, 'url': url,
+        }
+    return Event(row.id, row.kind, scopes, data)
+
+
+def load(after_id, limit):
+    rows = ChangeEvent.objects.filter(id__gt=after_id).order_by('id')
+    return [to_event(row) for row in rows[:limit]]
+
+
+class Broker:
+    """Общий для потоков процесса буфер последних событий журнала."""
+
+    def __init__(self, buffer_size=None, poll_interval=None):
+        self.buffer_size = buffer_size or settings.EVENTS_BUFFER_SIZE
+        self.poll_interval = (
+            poll_interval if poll_interval is not None
+            else settings.EVENTS_POLL_INTERVAL
+        )
+        self.condition = threading.Condition()
+        self.events = deque()
+        # Буфер покрывает события с id в (start_id, last_id].
+        self.start_id = None
+        self.last_id = None
+        self.polling = False
+        self.next_poll = 0
+
+    def _append(self, events):
+        for event in events:
+            self.events.append(event)
+            if len(self.events) > self.buffer_size:
+                self.start_id = self.events.popleft().id
+        if events:
+            self.last_id = events[-1].id
+
+    def refresh(self, timeout):
+        """Забирает новые события или ждёт, пока это сделает другой."""
+        with self.condition:
+            now = time.monotonic()
+            if self.polling or now < self.next_poll:
+                wait = timeout
+                if not self.polling:
+                    wait = min(timeout, self.next_poll - now)
+                self.condition.wait(wait)
+                return
+            self.polling = True
+        events = []
+        last_id = None
+        try:
+            if self.last_id is None:
+                last_id = ChangeEvent.objects.order_by('-id').values_list(
+                    'id', flat=True
+                ).first() or 0
+            else:
+                last_id = self.last_id
+                events = load(last_id, self.buffer_size)
+        finally:
+            with self.condition:
+                if self.last_id is None and last_id is not None:
+                    self.start_id = self.last_id = last_id
+                self._append(events)
+                self.polling = False
+                self.next_poll = time.monotonic() + self.poll_interval
+                self.condition.notify_all()
+
+    def current_id(self):
+        while self.last_id is None:
+            self.refresh(self.poll_interval)
+        return self.last_id
+
+    def after(self, after_id):
+        """События после after_id, RESET или [] — если новых нет."""
+        with self.condition:
+            if after_id >= self.last_id:
+                return []
+            if after_id >= self.start_id:
+                return [
+                    event for event in self.events if event.id > after_id
+                ]
+        # Пропущенное уже вытеснено из буфера.
+        events = load(after_id, self.buffer_size + 1)
+        if len(events) > self.buffer_size:
+            return RESET
+        return events
+
+    def wait(self, after_id, timeout):
+        """Ждёт событий после after_id не дольше timeout секунд."""
+        deadline = time.monotonic() + timeout
+        self.current_id()
+        while True:
+            events = self.after(after_id)
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events
+            self.refresh(remaining)
+
+
+broker = Broker()
+
+
+class OpenStream:
+    """Поток SSE, который держит место в Streams до close()."""
+
+    def __init__(self, streams, lines):
+        self.streams = streams
+        self.lines = lines
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def close(self):
+        # Сервер закрывает ответ и тогда, когда поток не начинался.
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.lines.close()
+        finally:
+            self.streams.release()
+
+
+class Streams:
+    """Число открытых потоков процесса с пределом EVENTS_MAX_STREAMS."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def open(self, lines):
+        """OpenStream для строк lines или None, если мест нет."""
+        with self.lock:
+            if self.count >= settings.EVENTS_MAX_STREAMS:
+                return None
+            self.count += 1
+        return OpenStream(self, lines)
+
+    def release(self):
+        with self.lock:
+            self.count -= 1
+
+
+streams = Streams()
+
+
+def retry_line():
+    return f'retry: {settings.EVENTS_RETRY * 1000}\n\n'
+
+
+def format_event(event):
+    data = json.dumps(event.data, separators=(',', ':'))
+    return f'id: {event.id}\nevent: {event.name}\ndata: {data}\n\n'
+
+
+def stream(scopes, last_id=None, source=None, duration=None):
+    """Строки потока SSE для подписки на области scopes."""
+    source = source or broker
+    if duration is None:
+        duration = settings.EVENTS_STREAM_DURATION
+    yield retry_line()
+    if last_id is None:
+        last_id = source.current_id()
+    deadline = time.monotonic() + duration
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = source.wait(
+            last_id, min(settings.EVENTS_HEARTBEAT, remaining)
+        )
+        if events == RESET:
+            yield 'event: reset\ndata: {}\n\n'
+            return
+        if not events:
+            # Комментарий держит соединение открытым через прокси.
+            yield ': ping\n\n'
+            continue
+        for event in events:
+            last_id = event.id
+            if event.scopes & scopes:
+                yield format_event(event)
+
+
+@job
+def prune():
+    """Удаляет события старше EVENTS_KEEP секунд, кроме последнего.
+
+    SQLite выдаёт новой строке id на единицу больше наибольшего
+    в таблице: без последней строки id пошли бы заново, и клиенты
+    со старым Last-Event-ID пропустили бы события.
+    """
+    border = timezone.now() - timedelta(seconds=settings.EVENTS_KEEP)
+    latest = ChangeEvent.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first()
+    return ChangeEvent.objects.filter(created__lt=border).exclude(
+        id=latest
+    ).delete()[0]
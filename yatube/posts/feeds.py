@@ -0,0 +1,118 @@
+"""RSS и Atom последних постов сайта, группы и автора.
+
+Ленты обёрнуты в anonymous_page_cache: ETag и Last-Modified берутся
+из версий областей в кэше, и опрос без новых постов получает 304,
+не читая таблицу постов.
+"""
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from . import caching
+from .decorators import anonymous_page_cache
+from .models import Group, Post, User
+
+FEED_ITEMS = 20
+
+
+class PostsFeed(Feed):
+    def latest(self, queryset):
+        return queryset.select_related('author', 'group')[:FEED_ITEMS]
+
+    def item_title(self, post):
+        return post.text.splitlines()[0][:80] if post.text else ''
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.id])
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group else []
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube: последние записи'
+    description = 'Новые посты на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return self.latest(Post.objects.all())
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def items(self, group):
+        return self.latest(group.posts.all())
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Посты пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def items(self, author):
+        return self.latest(author.posts.all())
+
+
+class IndexAtomFeed(IndexFeed):
+    feed_type = Atom1Feed
+    subtitle = IndexFeed.description
+
+
+class GroupAtomFeed(GroupFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, group):
+        return group.description
+
+
+class AuthorAtomFeed(AuthorFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, author):
+        return self.description(author)
+
+
+def cached(feed_class, scopes_func):
+    # Лента одинакова для всех, поэтому кэшируется и для вошедших.
+    return anonymous_page_cache(scopes_func, anonymous_only=False)(
+        feed_class()
+    )
+
+
+index_rss = cached(IndexFeed, caching.index_page_scopes)
+index_atom = cached(IndexAtomFeed, caching.index_page_scopes)
+group_rss = cached(GroupFeed, caching.group_page_scopes)
+group_atom = cached(GroupAtomFeed, caching.group_page_scopes)
+profile_rss = cached(AuthorFeed, caching.profile_page_scopes)
+profile_atom = cached(AuthorAtomFeed, caching.profile_page_scopes)
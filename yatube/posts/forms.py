@@ -1,6 +1,9 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Comment, Post
+from .images import normalize
+from .models import Comment, Group, Post
+from .search import match_expression
 
 
 class PostForm(forms.ModelForm):
@@ -9,6 +12,13 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Нормализуем только новую загрузку, а не уже сохранённый файл.
+        if isinstance(image, UploadedFile):
+            return normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
 
@@ -18,3 +28,18 @@ class CommentForm(forms.ModelForm):
         widgets = {
             'text': forms.Textarea(),
         }
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200)
+    group = forms.ModelChoiceField(
+        Group.objects.all(), to_field_name='slug', required=False,
+        label='Группа', empty_label='Все группы'
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
+
+    def clean_q(self):
+        query = self.cleaned_data['q']
+        if match_expression(query) is None:
+            raise forms.ValidationError('В запросе нет слов для поиска.')
+        return query
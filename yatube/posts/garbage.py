@@ -0,0 +1,176 @@
+"""Сборка осиротевших картинок постов, миниатюр и записей sorl.
+
+Каталоги MEDIA_ROOT обходятся потоково через os.scandir, а имена
+проверяются пачками по batch_size одним запросом на пачку, поэтому
+память не зависит от числа файлов. Свежие файлы моложе min_age
+не трогаются: их пост может быть ещё не закоммичен. Перед удалением
+картинки ссылки на неё и время изменения проверяются ещё раз.
+"""
+import os
+import time
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from core.utils import chunks
+
+from .models import MediaFile, Post
+
+
+def walk(root):
+    """Файлы каталога и подкаталогов: (имя от MEDIA_ROOT, DirEntry)."""
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            entries = os.scandir(path)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+                    yield name.replace(os.sep, '/'), entry
+
+
+class Collector:
+    def __init__(self, batch_size=1000, min_age=3600, rate=None,
+                 dry_run=False):
+        self.batch_size = batch_size
+        self.min_age = min_age
+        self.interval = 1 / rate if rate else 0
+        self.dry_run = dry_run
+        self.stats = dict.fromkeys(
+            ('scanned', 'orphaned', 'deleted', 'freed', 'stale_keys'), 0
+        )
+
+    def _old_files(self, directory):
+        deadline = time.time() - self.min_age
+        for name, entry in walk(os.path.join(settings.MEDIA_ROOT, directory)):
+            self.stats['scanned'] += 1
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime <= deadline:
+                yield name, entry.path, stat.st_size
+
+    def _delete(self, path, size):
+        self.stats['orphaned'] += 1
+        if self.dry_run:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self.stats['deleted'] += 1
+        self.stats['freed'] += size
+        if self.interval:
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _referenced(names):
+        return set(
+            Post.objects.filter(image__in=names).values_list(
+                'image', flat=True
+            )
+        ) | set(
+            MediaFile.objects.filter(name__in=names).values_list(
+                'name', flat=True
+            )
+        )
+
+    def _still_orphaned(self, name, path):
+        """Повторная проверка файла перед самым удалением.
+
+        Пока пачка удаляется, особенно с --rate, та же картинка может
+        снова загрузиться: хранилище обновит время изменения файла,
+        а пост после коммита сошлётся на него.
+        """
+        try:
+            if os.stat(path).st_mtime > time.time() - self.min_age:
+                return False
+        except FileNotFoundError:
+            return False
+        return not self._referenced([name])
+
+    def collect_images(self):
+        """Картинки в posts/ без постов и без счётчика ссылок."""
+        for batch in chunks(self._old_files('posts'), self.batch_size):
+            referenced = self._referenced([name for name, _, _ in batch])
+            for name, path, size in batch:
+                if name in referenced or not self._still_orphaned(name, path):
+                    continue
+                self._delete(path, size)
+
+    def _source_names(self, source_keys):
+        rows = KVStore.objects.filter(
+            key__in=[add_prefix(key) for key in source_keys]
+        ).values_list('key', 'value')
+        return {
+            key.split('||')[-1]: deserialize_image_file(value).name
+            for key, value in rows
+        }
+
+    def _drop_keys(self, keys):
+        self.stats['stale_keys'] += len(keys)
+        if self.dry_run or not keys:
+            return
+        KVStore.objects.filter(key__in=keys).delete()
+        default.kvstore.cache.delete_many(keys)
+
+    def collect_kvstore(self):
+        """Записи sorl об исходниках без постов и об их миниатюрах."""
+        lists = KVStore.objects.filter(
+            key__startswith=add_prefix('', 'thumbnails')
+        ).order_by('key').values_list('key', 'value')
+        last_key = ''
+        while True:
+            batch = list(lists.filter(key__gt=last_key)[:self.batch_size])
+            if not batch:
+                return
+            last_key = batch[-1][0]
+            sources = {key.split('||')[-1]: value for key, value in batch}
+            names = self._source_names(sources)
+            referenced = set(
+                Post.objects.filter(
+                    image__in=list(names.values())
+                ).values_list('image', flat=True)
+            )
+            stale = []
+            for source_key, value in sources.items():
+                if names.get(source_key) in referenced:
+                    continue
+                stale.append(add_prefix(source_key, 'thumbnails'))
+                stale.append(add_prefix(source_key))
+                stale += [add_prefix(key) for key in deserialize(value)]
+            self._drop_keys(stale)
+
+    def collect_thumbnails(self):
+        """Файлы миниатюр, о которых sorl больше не знает."""
+        directory = thumbnail_settings.THUMBNAIL_PREFIX.strip('/')
+        for batch in chunks(self._old_files(directory), self.batch_size):
+            keys = {
+                add_prefix(ImageFile(name, default.storage).key): (path, size)
+                for name, path, size in batch
+            }
+            known = set(
+                KVStore.objects.filter(key__in=list(keys)).values_list(
+                    'key', flat=True
+                )
+            )
+            for key, (path, size) in keys.items():
+                if key not in known:
+                    self._delete(path, size)
+
+    def collect(self):
+        self.collect_images()
+        # Сначала записи: миниатюры удалённых исходников станут
+        # неизвестными sorl и уйдут при обходе файлов.
+        self.collect_kvstore()
+        self.collect_thumbnails()
+        return self.stats
@@ -0,0 +1,103 @@
+"""Приём картинок постов: дешёвая проверка и нормализация.
+
+validate_image() читает только заголовок файла и отсекает слишком
+большие файлы и размеры до декодирования. normalize() уменьшает
+картинку до POST_IMAGE_MAX_SIDE по длинной стороне, поворачивает
+по EXIF, отбрасывает метаданные и перекодирует в исходном формате,
+поэтому на диске лежит уже лёгкий файл, а миниатюры строятся из него.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# Из info переносятся только ключи, без которых картинка изменится.
+KEPT_INFO = ('transparency', 'duration', 'loop')
+
+
+def _open(file):
+    """Открывает картинку, читая лишь заголовок."""
+    file.seek(0)
+    try:
+        return Image.open(file)
+    except Exception:
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image'
+        )
+
+
+def validate_image(file):
+    """Проверяет размер файла, формат и число пикселей по заголовку."""
+    if getattr(file, '_committed', False):
+        # Уже сохранённый файл проверен при загрузке.
+        return
+    limit = settings.POST_IMAGE_MAX_UPLOAD_SIZE
+    if file.size is not None and file.size > limit:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='file_too_large', params={'limit': limit // 2 ** 20}
+        )
+    image = _open(file)
+    try:
+        if image.format not in ALLOWED_FORMATS:
+            raise ValidationError(
+                'Формат %(format)s не поддерживается.',
+                code='invalid_format', params={'format': image.format}
+            )
+        width, height = image.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Изображение %(width)d×%(height)d слишком большое.',
+                code='too_many_pixels',
+                params={'width': width, 'height': height}
+            )
+    finally:
+        file.seek(0)
+
+
+def _save_options(image_format):
+    quality = settings.POST_IMAGE_QUALITY
+    return {
+        'JPEG': {'quality': quality, 'optimize': True, 'progressive': True},
+        'PNG': {'optimize': True},
+        'WEBP': {'quality': quality},
+    }.get(image_format, {})
+
+
+def normalize(file):
+    """Уменьшенная копия картинки без метаданных с тем же именем.
+
+    EXIF с геометкой и прочие метаданные отбрасываются, цветовой
+    профиль ICC сохраняется.
+    """
+    validate_image(file)
+    image = _open(file)
+    image_format = image.format
+    if getattr(image, 'is_animated', False):
+        # Анимацию покадрово не пережимаем: хватает проверки размеров.
+        file.seek(0)
+        return file
+    side = settings.POST_IMAGE_MAX_SIDE
+    if image_format == 'JPEG':
+        # JPEG декодируется сразу в уменьшенном масштабе.
+        image.draft('RGB', (side, side))
+    info = {key: image.info[key] for key in KEPT_INFO if key in image.info}
+    options = _save_options(image_format)
+    if image.info.get('icc_profile'):
+        # Цветовой профиль не метаданные: без него поплывут цвета.
+        options['icc_profile'] = image.info['icc_profile']
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((side, side), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        # Профиль CMYK к пикселям после преобразования не подходит.
+        image = image.convert('RGB')
+        options.pop('icc_profile', None)
+    image.info = info
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    return SimpleUploadedFile(
+        file.name, output.getvalue(), content_type=Image.MIME[image_format]
+    )
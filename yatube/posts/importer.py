@@ -0,0 +1,261 @@
+"""Массовый импорт постов и комментариев из JSONL или CSV.
+
+Строки читаются потоком, авторы и группы ищутся по словарям в памяти,
+а посты и комментарии вставляются bulk_create пачками по batch_size,
+по chunk_size пачек в транзакции. Сигналы при этом не срабатывают,
+поэтому счётчики, ленты, кэш и поисковый индекс обновляются один раз
+в конце, только для затронутых авторов и групп.
+
+Строка JSONL:
+
+    {"author": "leo", "text": "...", "group": "cats",
+     "pub_date": "2019-05-01T10:00:00+03:00",
+     "comments": [{"author": "ann", "text": "...", "created": "..."}]}
+
+В CSV колонки author, text, group, pub_date, комментариев в нём нет.
+Без даты пост или комментарий получает время импорта.
+"""
+import csv
+import json
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.utils import chunks
+
+from . import caching, counters, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Столько ошибок в строках запоминается для отчёта.
+MAX_ERRORS = 100
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def read_jsonl(stream):
+    """Записи файла JSONL: (номер строки, словарь или ошибка)."""
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            record = InvalidRecord(f'Неверный JSON: {error}')
+        yield number, record
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    for record in reader:
+        yield reader.line_num, record
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+def last_post_id():
+    return Post.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Внутри блока auto_now_add не затирает даты из файла."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+@contextmanager
+def indexes_dropped(*models):
+    """Индексы Meta.indexes моделей снимаются и строятся заново в конце."""
+    indexes = [
+        (model, index) for model in models for index in model._meta.indexes
+    ]
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+
+
+class Importer:
+    def __init__(self, batch_size=1000, chunk_size=10, create_missing=False,
+                 drop_indexes=False):
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        self.drop_indexes = drop_indexes
+        self.authors = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.touched_authors = set()
+        self.touched_groups = set()
+        self.stats = dict.fromkeys(('posts', 'comments', 'skipped'), 0)
+        self.errors = []
+
+    def author_id(self, username):
+        if not username:
+            raise InvalidRecord('Не указан автор')
+        if username not in self.authors:
+            if not self.create_missing:
+                raise InvalidRecord(f'Нет пользователя {username}')
+            self.authors[username] = User.objects.create_user(username).id
+        return self.authors[username]
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            if not self.create_missing:
+                raise InvalidRecord(f'Нет группы {slug}')
+            self.groups[slug] = Group.objects.create(
+                title=slug, slug=slug, description=''
+            ).id
+        return self.groups[slug]
+
+    def parse_date(self, value):
+        if not value:
+            return timezone.now()
+        date = parse_datetime(value)
+        if date is None:
+            raise InvalidRecord(f'Неверная дата {value}')
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def text(self, record):
+        text = record.get('text')
+        if not text:
+            raise InvalidRecord('Пустой текст')
+        return text
+
+    def build(self, record):
+        """Несохранённые пост и его комментарии по записи файла."""
+        if isinstance(record, Exception):
+            raise record
+        if not isinstance(record, dict):
+            raise InvalidRecord('Запись — не объект')
+        comments = [
+            Comment(
+                author_id=self.author_id(comment.get('author')),
+                text=self.text(comment),
+                created=self.parse_date(comment.get('created')),
+            )
+            for comment in record.get('comments') or ()
+        ]
+        post = Post(
+            author_id=self.author_id(record.get('author')),
+            group_id=self.group_id(record.get('group')),
+            text=self.text(record),
+            pub_date=self.parse_date(record.get('pub_date')),
+            comments_count=len(comments),
+        )
+        return post, comments
+
+    def skip(self, number, error):
+        self.stats['skipped'] += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((number, str(error)))
+
+    def insert(self, rows):
+        built = []
+        for number, record in rows:
+            try:
+                built.append(self.build(record))
+            except (InvalidRecord, AttributeError, TypeError) as error:
+                self.skip(number, error)
+        if not built:
+            return
+        posts = [post for post, _ in built]
+        Post.objects.bulk_create(posts)
+        if posts[0].pk is None:
+            # SQLite не возвращает id из bulk_create. Транзакция держит
+            # блокировку записи, поэтому последние id — наши.
+            ids = Post.objects.order_by('-id').values_list(
+                'id', flat=True
+            )[:len(posts)]
+            for post, post_id in zip(posts, reversed(ids)):
+                post.id = post_id
+        comments = []
+        for post, post_comments in built:
+            for comment in post_comments:
+                comment.post_id = post.id
+            comments += post_comments
+        Comment.objects.bulk_create(comments)
+        self.touched_authors.update(post.author_id for post in posts)
+        self.touched_groups.update(
+            post.group_id for post in posts if post.group_id is not None
+        )
+        self.stats['posts'] += len(posts)
+        self.stats['comments'] += len(comments)
+
+    def run(self, records, progress=None):
+        """Импортирует записи (номер строки, запись), возвращает stats."""
+        last_id = until = last_post_id()
+        try:
+            with explicit_dates(
+                Post._meta.get_field('pub_date'),
+                Comment._meta.get_field('created'),
+            ), search.insert_trigger_suspended():
+                try:
+                    if self.drop_indexes:
+                        with indexes_dropped(Post, Comment):
+                            self._import(records, progress)
+                    else:
+                        self._import(records, progress)
+                finally:
+                    # Граница берётся, пока триггер снят: посты после
+                    # неё индексирует он сам.
+                    until = last_post_id()
+        finally:
+            # Пачки до ошибки уже закоммичены: без finish они остались
+            # бы вне поиска, счётчиков и лент.
+            self.finish(last_id, until)
+        return self.stats
+
+    def _import(self, records, progress):
+        rows_per_transaction = self.batch_size * self.chunk_size
+        for chunk in chunks(records, rows_per_transaction):
+            with transaction.atomic():
+                for rows in chunks(chunk, self.batch_size):
+                    self.insert(rows)
+            if progress is not None:
+                progress(self.stats)
+
+    def finish(self, last_id, until):
+        """Отложенные обновления: поиск, счётчики, ленты и кэш.
+
+        В поиск добавляются посты с id от last_id до until: вставленные,
+        пока триггер индекса был снят.
+        """
+        search.index_after(last_id, self.batch_size, until)
+        counters.recount_users(self.batch_size, self.touched_authors)
+        counters.recount_groups(self.batch_size, self.touched_groups)
+        followers = Follow.objects.filter(
+            author_id__in=self.touched_authors
+        ).order_by().values_list('user_id', flat=True).distinct()
+        for user_id in followers.iterator():
+            timeline.rebuild(user_id)
+        scopes = [caching.INDEX]
+        scopes += [caching.author_scope(id) for id in self.touched_authors]
+        scopes += [caching.group_scope(id) for id in self.touched_groups]
+        caching.invalidate_counts(scopes)
+        caching.bump_versions(scopes)
+        caching.invalidate_follow_counts()
@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _init_worker():
+    django.setup()
+    # Соединение родителя после fork не переиспользуем.
+    connections.close_all()
+
+
+def _generate(post_ids):
+    for post_id in post_ids:
+        thumbnails.generate(post_id)
+    return len(post_ids)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие варианты миниатюр для уже загруженных '
+        'картинок постов в пуле процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов; 0 — без пула, в текущем процессе.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Сколько постов отдавать процессу за раз.'
+        )
+
+    def batches(self, batch_size):
+        post_ids = Post.objects.exclude(image='').order_by('id').values_list(
+            'id', flat=True
+        )
+        last_id = 0
+        while True:
+            batch = list(post_ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]
+
+    def handle(self, *args, workers, batch_size, **options):
+        done = 0
+        if not workers:
+            for batch in self.batches(batch_size):
+                done += _generate(batch)
+            self.stdout.write(f'Обработано постов: {done}')
+            return
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            pending = set()
+            for batch in self.batches(batch_size):
+                # Держим в работе не больше двух пачек на процесс,
+                # чтобы не читать все id в память заранее.
+                if len(pending) >= workers * 2:
+                    finished, pending = wait(
+                        pending, return_when=FIRST_COMPLETED
+                    )
+                    done += sum(future.result() for future in finished)
+                pending.add(pool.submit(_generate, batch))
+            done += sum(future.result() for future in wait(pending).done)
+        self.stdout.write(f'Обработано постов: {done}')
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from posts.garbage import Collector
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов и миниатюры, на которые ничего не '
+        'ссылается, и устаревшие записи sorl-thumbnail.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько имён проверять одним запросом.'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд.'
+        )
+        parser.add_argument(
+            '--rate', type=float, default=None,
+            help='Не больше стольких удалений файлов в секунду.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать файлы и записи, которые будут удалены.'
+        )
+
+    def handle(self, *args, batch_size, min_age, rate, dry_run, **options):
+        stats = Collector(batch_size, min_age, rate, dry_run).collect()
+        if dry_run:
+            self.stdout.write(
+                f"Просмотрено файлов: {stats['scanned']}, "
+                f"будет удалено: {stats['orphaned']}, "
+                f"записей sorl: {stats['stale_keys']}"
+            )
+            return
+        self.stdout.write(
+            f"Просмотрено файлов: {stats['scanned']}, "
+            f"удалено: {stats['deleted']} ({stats['freed']} байт), "
+            f"записей sorl: {stats['stale_keys']}"
+        )
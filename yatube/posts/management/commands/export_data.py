@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import FORMATS, TABLES, export
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии или подписки в JSONL '
+        'или CSV; с --state — только строки после прошлой выгрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=list(TABLES))
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл выгрузки; по умолчанию стандартный вывод.'
+        )
+        parser.add_argument(
+            '--format', choices=list(FORMATS), default='jsonl',
+            dest='file_format'
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--since', help='Выгрузить строки не раньше этой даты (ISO).'
+        )
+        parser.add_argument(
+            '--since-id', type=int,
+            help='Выгрузить строки с id больше этого.'
+        )
+        parser.add_argument(
+            '--state',
+            help='JSON-файл водяных знаков: читается перед выгрузкой '
+                 'и обновляется после неё.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк читать из базы за раз.'
+        )
+
+    def read_state(self, path):
+        if path is None or not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+
+    def write_state(self, path, state):
+        # Через временный файл: упавшая запись не портит прошлый знак.
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(state, file, indent=2)
+        os.replace(temporary, path)
+
+    def handle(self, *args, table, output, file_format, gzip, since,
+               since_id, state, chunk_size, **options):
+        exported = TABLES[table]
+        watermarks = self.read_state(state)
+        if since is None and since_id is None:
+            since_id = watermarks.get(table, {}).get('since_id')
+        try:
+            since_id, since_date = exported.parse_since(since, since_id)
+        except ValueError as error:
+            raise CommandError(error)
+        until = exported.watermark()
+        chunks = export(
+            exported, file_format, gzip, since_id, until, chunk_size,
+            since_date
+        )
+        if output == '-':
+            stream = sys.stdout.buffer
+            for chunk in chunks:
+                stream.write(chunk)
+            stream.flush()
+        else:
+            with open(output, 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+        if state is not None and until is not None:
+            watermarks[table] = exported.format_watermark(until)
+            self.write_state(state, watermarks)
+        self.stderr.write(
+            f'Выгружено до {exported.format_watermark(until) or "-"}'
+        )
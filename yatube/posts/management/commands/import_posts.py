@@ -0,0 +1,93 @@
+import gzip
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import READERS, Importer
+
+EXTENSIONS = {
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.csv': 'csv',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты и комментарии из JSONL или CSV пачками '
+        'bulk_create; счётчики, ленты и поиск обновляются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл (можно .gz) или - для стандартного ввода.'
+        )
+        parser.add_argument(
+            '--format', choices=list(READERS), dest='file_format',
+            help='Формат файла; по умолчанию по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов вставлять одним bulk_create.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=10,
+            help='Сколько пачек вставлять в одной транзакции.'
+        )
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов и группы.'
+        )
+        parser.add_argument(
+            '--drop-indexes', action='store_true',
+            help='Снять индексы постов и комментариев на время импорта.'
+        )
+
+    def detect_format(self, path):
+        name = path[:-3] if path.endswith('.gz') else path
+        file_format = EXTENSIONS.get(os.path.splitext(name)[1].lower())
+        if file_format is None:
+            raise CommandError('Укажите формат файла: --format')
+        return file_format
+
+    def open(self, path):
+        if path == '-':
+            return sys.stdin
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rt', encoding='utf-8', newline='')
+        return open(path, encoding='utf-8', newline='')
+
+    def handle(self, *args, path, file_format, batch_size, chunk_size,
+               create_missing, drop_indexes, **options):
+        file_format = file_format or self.detect_format(path)
+        importer = Importer(
+            batch_size, chunk_size, create_missing, drop_indexes
+        )
+        started = time.monotonic()
+
+        def progress(stats):
+            rows = stats['posts'] + stats['comments']
+            rate = rows / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"Постов: {stats['posts']}, комментариев: "
+                f"{stats['comments']}, пропущено: {stats['skipped']}, "
+                f'{rate:.0f} строк/с'
+            )
+
+        try:
+            stream = self.open(path)
+        except OSError as error:
+            raise CommandError(error)
+        with stream:
+            stats = importer.run(READERS[file_format](stream), progress)
+        for number, message in importer.errors:
+            self.stderr.write(f'Строка {number}: {message}')
+        elapsed = time.monotonic() - started
+        rows = stats['posts'] + stats['comments']
+        self.stdout.write(self.style.SUCCESS(
+            f"Импортировано постов: {stats['posts']}, комментариев: "
+            f"{stats['comments']}, пропущено: {stats['skipped']} "
+            f'за {elapsed:.1f} с ({rows / max(elapsed, 1e-6):.0f} строк/с)'
+        ))
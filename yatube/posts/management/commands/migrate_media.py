@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import media, thumbnails
+from posts.models import Post
+from posts.storage import content_storage
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в контентно-адресуемое хранилище: '
+        'posts/ab/cd/<sha256>.ext с дедупликацией.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Сколько постов переносить в одной транзакции.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать посты со старыми именами файлов.'
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        posts = Post.objects.exclude(image='').order_by('id').values_list(
+            'id', 'image'
+        )
+        moved = missing = 0
+        last_id = 0
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            batch = [
+                (post_id, name) for post_id, name in batch
+                if not content_storage.is_content_addressed(name)
+            ]
+            if dry_run:
+                moved += len(batch)
+                continue
+            with transaction.atomic():
+                for post_id, name in batch:
+                    if not content_storage.exists(name):
+                        missing += 1
+                        self.stderr.write(f'Нет файла {name} (пост {post_id})')
+                        continue
+                    with content_storage.open(name) as file:
+                        new_name = content_storage.save(name, file)
+                    Post.objects.filter(id=post_id, image=name).update(
+                        image=new_name
+                    )
+                    media.acquire(new_name)
+                    media.release(name)
+                    thumbnails.schedule(Post(id=post_id, image=new_name))
+                    moved += 1
+        verb = 'Будет перенесено' if dry_run else 'Перенесено'
+        self.stdout.write(f'{verb} файлов: {moved}, не найдено: {missing}')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов индексировать за раз.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        indexed = search.rebuild(batch_size)
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', default=[],
+            help='Пересобрать ленту только этого пользователя.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько пользователей читать из базы за раз.'
+        )
+
+    def handle(self, *args, usernames, batch_size, **options):
+        users = User.objects.all()
+        if usernames:
+            users = users.filter(username__in=usernames)
+        user_ids = users.order_by('id').values_list('id', flat=True)
+        rebuilt = 0
+        last_id = 0
+        while True:
+            batch = list(user_ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for user_id in batch:
+                timeline.rebuild(user_id)
+            rebuilt += len(batch)
+            last_id = batch[-1]
+            self.stdout.write(f'Пересобрано лент: {rebuilt}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, лент: {rebuilt}'))
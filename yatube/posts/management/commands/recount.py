@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters
+
+TARGETS = {
+    'users': counters.recount_users,
+    'groups': counters.recount_groups,
+    'posts': counters.recount_posts,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики постов, подписок '
+        'и комментариев и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        # Не choices: argparse проверяет по ним и пустой список
+        # позиционного nargs='*', а он здесь значит «всё».
+        parser.add_argument(
+            'targets', nargs='*', metavar='target',
+            help='Что пересчитать: users, groups, posts. По умолчанию всё.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк пересчитывать за раз.'
+        )
+
+    def handle(self, *args, targets, batch_size, **options):
+        unknown = [target for target in targets if target not in TARGETS]
+        if unknown:
+            raise CommandError(
+                f'Неизвестные цели: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(TARGETS)}'
+            )
+        for target in targets or TARGETS:
+            fixed = TARGETS[target](batch_size)
+            self.stdout.write(f'{target}: исправлено строк {fixed}')
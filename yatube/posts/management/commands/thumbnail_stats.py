@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает долю попаданий в кэш key-value хранилища '
+        'миниатюр sorl.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.'
+        )
+
+    def handle(self, *args, reset, **options):
+        hits, misses = thumbnails.read_stats()
+        total = hits + misses
+        rate = hits / total * 100 if total else 0
+        self.stdout.write(
+            f'Попаданий: {hits}, промахов: {misses}, '
+            f'доля попаданий: {rate:.1f}%'
+        )
+        if reset:
+            thumbnails.reset_stats()
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from posts import timeline
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает, каким путём (push или pull) посты каждого автора '
+        'попадают в ленты подписчиков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author', action='append', dest='usernames', default=[],
+            help='Показать только этого автора.'
+        )
+        parser.add_argument(
+            '--apply', action='store_true',
+            help='Перевести авторов на путь по текущему числу подписчиков.'
+        )
+
+    def handle(self, *args, usernames, apply, **options):
+        authors = Follow.objects.all()
+        if usernames:
+            authors = authors.filter(author__username__in=usernames)
+        authors = authors.values(
+            'author_id', 'author__username', 'author__pull_feed'
+        ).annotate(followers=Count('id')).order_by('-followers')
+        for row in authors.iterator():
+            pulled = row['author__pull_feed'] is not None
+            current = timeline.PULL if pulled else timeline.PUSH
+            target = timeline.strategy(
+                row['author_id'], row['followers'], pulled
+            )
+            if apply and target != current:
+                timeline.update_strategy(row['author_id'], row['followers'])
+                current = target
+            note = '' if target == current else f' (ожидается {target})'
+            self.stdout.write(
+                f"{row['author__username']}: {current}, "
+                f"подписчиков {row['followers']}{note}"
+            )
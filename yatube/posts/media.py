@@ -0,0 +1,57 @@
+"""Счётчики ссылок постов на файлы картинок.
+
+Одинаковые загрузки делят один файл контентно-адресуемого хранилища,
+поэтому файл удаляется с диска вместе с миниатюрами только после
+коммита транзакции, в которой на него пропала последняя ссылка.
+"""
+import logging
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .models import MediaFile, Post
+from .storage import content_storage
+
+logger = logging.getLogger(__name__)
+
+
+def acquire(name):
+    if not name:
+        return
+    files = MediaFile.objects.filter(name=name)
+    if not files.update(refs=F('refs') + 1):
+        MediaFile.objects.get_or_create(name=name)
+        files.update(refs=F('refs') + 1)
+
+
+def release(name):
+    if not name:
+        return
+    # Счётчик мог отстать от постов (update() в обход сигналов): ниже
+    # нуля его не пускает CHECK, и удаление поста упало бы с ошибкой.
+    MediaFile.objects.filter(name=name).update(
+        refs=Greatest(F('refs') - 1, 0)
+    )
+    if MediaFile.objects.filter(name=name, refs=0).delete()[0]:
+        transaction.on_commit(lambda: delete_file(name))
+
+
+def delete_file(name):
+    """Удаляет файл и его миниатюры, если на него снова не сослались."""
+    if (
+        MediaFile.objects.filter(name=name).exists()
+        or Post.objects.filter(image=name).exists()
+    ):
+        return
+    try:
+        # Миниатюры sorl записаны под ключом исходника вместе с его
+        # хранилищем, поэтому имя передаётся вместе с ним.
+        delete_with_thumbnails(ImageFile(name, content_storage))
+    except (OSError, SuspiciousFileOperation):
+        # Ошибка удаления не должна ронять транзакцию, которая уже
+        # закоммичена; файл подберёт сборщик мусора.
+        logger.warning('Не удалось удалить файл %s', name, exc_info=True)
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:02
+
+from django.db import migrations, models
+import posts.images
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_search'),
+    ]
+
+    # Валидаторы не меняют схему, а AlterField в SQLite пересоздал бы
+    # posts_post и потерял триггеры поискового индекса из 0014.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='image',
+                    field=models.ImageField(blank=True, upload_to='posts/', validators=[posts.images.validate_image], verbose_name='Картинка'),
+                ),
+            ],
+        ),
+    ]
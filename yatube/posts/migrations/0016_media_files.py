@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:04
+
+from django.db import migrations, models
+import posts.images
+import posts.storage
+
+
+def count_refs(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    MediaFile = apps.get_model('posts', 'MediaFile')
+    refs = Post.objects.exclude(image='').values('image').annotate(
+        total=models.Count('id')
+    ).order_by()
+    MediaFile.objects.bulk_create(
+        MediaFile(name=row['image'], refs=row['total']) for row in refs
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refs', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        # Хранилище не меняет схему; см. 0015 о триггерах поиска.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='image',
+                    field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', validators=[posts.images.validate_image], verbose_name='Картинка'),
+                ),
+            ],
+        ),
+        migrations.RunPython(count_refs, migrations.RunPython.noop),
+    ]
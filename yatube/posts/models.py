@@ -2,6 +2,9 @@ from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import UniqueConstraint
 
+from .images import validate_image
+from .storage import content_storage
+
 User = get_user_model()
 
 
@@ -9,6 +12,7 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
@@ -37,11 +41,28 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=content_storage,
+        blank=True,
+        validators=[validate_image]
     )
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -60,6 +81,14 @@ class Comment(models.Model):
     text = models.TextField('Текст', help_text='Текст нового комментария')
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     author = models.ForeignKey(
@@ -77,3 +106,107 @@ class Follow(models.Model):
         constraints = [
             UniqueConstraint(fields=['author', 'user'], name='unique_follow')
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'],
+                name='follow_user_author_idx'
+            ),
+        ]
+
+
+class UserCounter(models.Model):
+    """Денормализованные счётчики пользователя.
+
+    Обновляются сигналами при создании и удалении постов и подписок,
+    расхождение чинит команда recount.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='counters'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_post_idx'
+            ),
+        ]
+
+
+class PullAuthor(models.Model):
+    """Автор, чьи посты не раскладываются по лентам, а читаются при запросе.
+
+    Так помечаются авторы с числом подписчиков от TIMELINE_PULL_THRESHOLD.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pull_feed'
+    )
+    since = models.DateTimeField(auto_now_add=True)
+
+
+class MediaFile(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него ссылаются."""
+    name = models.CharField(max_length=255, unique=True)
+    refs = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class ChangeEvent(models.Model):
+    """Запись журнала изменений для потока событий (SSE).
+
+    id события — он же Last-Event-ID клиента. Ссылки хранятся числами
+    без внешних ключей: удаление поста не должно стирать журнал.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    KIND_CHOICES = (
+        (POST, 'Новый пост'),
+        (COMMENT, 'Новый комментарий'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    post_id = models.PositiveIntegerField()
+    author_id = models.PositiveIntegerField()
+    group_id = models.PositiveIntegerField(null=True, blank=True)
+    comment_id = models.PositiveIntegerField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class CacheStat(models.Model):
+    """Счётчик попаданий или промахов кэша, общий для всех процессов."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
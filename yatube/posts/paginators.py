@@ -0,0 +1,286 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .caching import CURSOR_PARAM
+FEED_ORDERING = ('-pub_date', '-id')
+# Комментарии идут от старых к новым, по индексу (post, created, id).
+COMMENT_ORDERING = ('created', 'id')
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def limited_count(object_list):
+    """Считает не дальше PAGINATOR_COUNT_LIMIT строк.
+
+    Второй элемент ответа показывает, что настоящее число
+    больше возвращённого.
+    """
+    limit = settings.PAGINATOR_COUNT_LIMIT
+    if not limit:
+        return object_list.count(), False
+    count = object_list.order_by()[:limit + 1].count()
+    if count > limit:
+        return limit, True
+    return count, False
+
+
+def count_objects(object_list, count_key=None, known_count=None):
+    """Число объектов без COUNT(*) на каждый запрос.
+
+    Готовое число (например, денормализованный счётчик) берётся
+    как есть. Иначе значение берётся из кэша по count_key; ключи
+    сбрасываются сигналами создания и удаления постов.
+    """
+    if known_count is not None:
+        return known_count, False
+    if count_key is None:
+        return limited_count(object_list)
+    result = cache.get(count_key)
+    if result is None:
+        result = limited_count(object_list)
+        cache.set(count_key, result, settings.PAGINATOR_COUNT_TIMEOUT)
+    return result
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт count из кэша или оценивает его сверху.
+
+    Оценка годится только для надписи «более N»: границы страниц по
+    ней обрезаны, поэтому для номера страницы за оценкой число
+    считается точно (см. use_exact_count).
+    """
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 known_count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.known_count = known_count
+
+    @cached_property
+    def counted(self):
+        return count_objects(
+            self.object_list, self.count_key, self.known_count
+        )
+
+    @property
+    def count(self):
+        return self.counted[0]
+
+    @property
+    def count_is_approximate(self):
+        return self.counted[1]
+
+    def use_exact_count(self):
+        """Заменяет оценку сверху настоящим числом объектов."""
+        if self.count_is_approximate:
+            self.counted = (self.object_list.count(), False)
+            self.__dict__.pop('num_pages', None)
+
+
+class CursorPage:
+    """Страница ключевой (keyset) пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page в той части,
+    которую использует includes/paginator.html.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def seek(fields, values, backwards=False):
+    """Условие «строго после курсора» для составного ключа.
+
+    fields — пары (поле, по убыванию). Цепочку OR SQLite не сводит
+    к диапазону индекса и читает его с начала, поэтому впереди стоит
+    нестрогая граница по первому полю: с ней план — SEARCH.
+    """
+    condition = Q()
+    equal = {}
+    for (name, descending), value in zip(fields, values):
+        lookup = 'lt' if descending != backwards else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    if len(equal) > 1:
+        (name, descending), value = fields[0], values[0]
+        lookup = 'lte' if descending != backwards else 'gte'
+        condition = Q(**{f'{name}__{lookup}': value}) & condition
+    return condition
+
+
+class CursorPaginator:
+    """Пагинация по ключу сортировки вместо OFFSET.
+
+    Курсор хранит значения полей ordering последнего (или первого)
+    объекта страницы, поэтому стоимость любой страницы одинакова:
+    выборка идёт по индексу от позиции курсора.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 count_key=None, known_count=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.count_key = count_key
+        self.known_count = known_count
+
+    @cached_property
+    def counted(self):
+        return count_objects(
+            self.object_list, self.count_key, self.known_count
+        )
+
+    @property
+    def count(self):
+        return self.counted[0]
+
+    @property
+    def count_is_approximate(self):
+        return self.counted[1]
+
+    def _fields(self):
+        return [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    def _field(self, name):
+        """Поле модели или аннотации queryset, по которому идёт сортировка."""
+        annotation = self.object_list.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def _value(self, obj, name):
+        value = getattr(obj, name)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def encode_cursor(self, obj, backwards=False):
+        payload = {
+            'v': [self._value(obj, name) for name, _ in self._fields()],
+            'b': int(backwards),
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            raw_values = payload['v']
+            backwards = bool(payload.get('b'))
+            fields = self._fields()
+            if len(raw_values) != len(fields):
+                raise InvalidCursor(cursor)
+            values = [
+                self._field(name).to_python(value)
+                for (name, _), value in zip(fields, raw_values)
+            ]
+        except InvalidCursor:
+            raise
+        except Exception:
+            raise InvalidCursor(cursor)
+        return values, backwards
+
+    def _seek(self, values, backwards):
+        return seek(self._fields(), values, backwards)
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else '-' + name
+            for name in self.ordering
+        ]
+
+    def page(self, cursor=None):
+        queryset = self.object_list
+        backwards = False
+        if cursor:
+            values, backwards = self.decode_cursor(cursor)
+            queryset = queryset.filter(self._seek(values, backwards))
+        if backwards:
+            queryset = queryset.order_by(*self._reversed_ordering())
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        has_next = has_more if not backwards else bool(cursor)
+        has_previous = has_more if backwards else bool(cursor)
+        next_cursor = None
+        previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], backwards=True)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        """Как Paginator.get_page: битый курсор даёт первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+def paginate(request, object_list, per_page, ordering=FEED_ORDERING,
+             count_key=None, known_count=None):
+    """Страница ленты для запроса.
+
+    С параметром ?cursor= используется ключевая пагинация,
+    иначе — обычная постраничная по ?page=. Число объектов
+    берётся из known_count или из кэша по count_key. Если оно лишь
+    оценено сверху, номеров всех страниц не знать: лента без ?page=
+    листается курсором, а явный номер проверяется по точному числу.
+    """
+    cursor = request.GET.get(CURSOR_PARAM)
+    number = request.GET.get('page')
+    cursor_paginator = CursorPaginator(
+        object_list, per_page, ordering, count_key, known_count
+    )
+    if cursor is not None:
+        return cursor_paginator.get_page(cursor)
+    paginator = CachedCountPaginator(
+        object_list.order_by(*ordering), per_page, count_key, known_count
+    )
+    if paginator.count_is_approximate:
+        if number is None:
+            return cursor_paginator.get_page()
+        paginator.use_exact_count()
+    return paginator.get_page(number)
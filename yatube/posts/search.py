@@ -0,0 +1,131 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс posts_post_fts — FTS5-таблица с внешним содержимым: текст
+хранится только в posts_post, а триггеры миграции 0014 обновляют
+индекс при любой вставке, правке и удалении поста, в том числе
+через bulk_create и QuerySet.update(). Миграция, пересоздающая
+posts_post в SQLite, удаляет и триггеры: их нужно создать заново
+и перестроить индекс командой rebuild_search_index. Массовый импорт
+отключает триггер вставки и индексирует новые посты одним проходом.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+# bm25 тем меньше, чем лучше совпадение; id разводит равные ранги.
+SEARCH_ORDERING = ('rank', 'id')
+TERM = re.compile(r'\w+')
+INSERT_TRIGGER = 'posts_post_fts_insert'
+# То же, что в миграции 0014.
+CREATE_INSERT_TRIGGER = f"""
+    CREATE TRIGGER IF NOT EXISTS {INSERT_TRIGGER} AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+"""
+
+
+def match_expression(query):
+    """Строка запроса пользователя в выражение MATCH.
+
+    Каждое слово берётся в кавычки, чтобы символы синтаксиса FTS5
+    из запроса не ломали его; последнее слово ищется как префикс.
+    Возвращает None, если в запросе нет слов.
+    """
+    terms = TERM.findall(query or '')
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_posts(query, queryset=None):
+    """Посты, подходящие под запрос, с аннотацией rank."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.annotate(
+            rank=Value(0.0, output_field=FloatField())
+        ).none()
+    # Соединение с FTS-таблицей ORM не выражает, поэтому extra().
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = posts_post.id', f'{FTS_TABLE} MATCH %s'],
+        params=[expression],
+    ).annotate(rank=RawSQL(f'{FTS_TABLE}.rank', (), FloatField()))
+
+
+def _index(ids, batch_size):
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = list(ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) '
+                'SELECT id, text FROM posts_post WHERE id BETWEEN %s AND %s',
+                (batch[0], batch[-1])
+            )
+        indexed += len(batch)
+        last_id = batch[-1]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+    return indexed
+
+
+def rebuild(batch_size):
+    """Перестраивает индекс пачками, возвращает число постов в нём.
+
+    Пока перестройка идёт, поиск видит неполный индекс.
+    """
+    restore_insert_trigger()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"
+        )
+    ids = Post.objects.order_by('id').values_list('id', flat=True)
+    return _index(ids, batch_size)
+
+
+def index_after(last_id, batch_size, until=None):
+    """Индексирует посты с id больше last_id, добавленные без триггера.
+
+    until ограничивает диапазон сверху: посты, созданные после возврата
+    триггера, уже в индексе, и второй раз их добавлять нельзя.
+    """
+    ids = Post.objects.filter(id__gt=last_id)
+    if until is not None:
+        ids = ids.filter(id__lte=until)
+    ids = ids.order_by('id').values_list('id', flat=True)
+    return _index(ids, batch_size)
+
+
+def restore_insert_trigger():
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_INSERT_TRIGGER)
+
+
+@contextmanager
+def insert_trigger_suspended():
+    """Вставки постов внутри блока не индексируются построчно.
+
+    После блока новые посты нужно проиндексировать index_after().
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {INSERT_TRIGGER}')
+    try:
+        yield
+    finally:
+        restore_insert_trigger()
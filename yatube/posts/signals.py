@@ -0,0 +1,140 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import caching, counters, events, media, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Поля, которые видны на страницах лент.
+GROUP_SHOWN_FIELDS = ('title', 'slug', 'description')
+USER_SHOWN_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    saved = None
+    if instance.pk is not None:
+        saved = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image'
+        ).first()
+    instance._saved_group_id, instance._saved_image = saved or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    scopes = caching.post_scopes(instance, instance._saved_group_id)
+    caching.invalidate_counts(scopes)
+    caching.bump_versions(scopes)
+    if created:
+        counters.post_created(instance)
+        timeline.fan_out(instance)
+        events.record_post(instance)
+    else:
+        counters.post_moved(instance._saved_group_id, instance.group_id)
+    if instance.image.name != instance._saved_image:
+        media.acquire(instance.image.name)
+        media.release(instance._saved_image)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_deleted(instance)
+    media.release(instance.image.name)
+    scopes = caching.post_scopes(instance)
+    caching.invalidate_counts(scopes)
+    caching.bump_versions(scopes)
+    caching.invalidate_follow_counts()
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.follow_changed(instance, 1)
+        timeline.update_strategy(instance.author_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+        caching.invalidate_follow_counts([instance.user_id])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_changed(instance, -1)
+    timeline.remove(instance.user_id, instance.author_id)
+    timeline.update_strategy(instance.author_id)
+    caching.invalidate_follow_counts([instance.user_id])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_post_comments(instance.post_id, 1)
+        events.record_comment(instance)
+    caching.bump_versions([caching.post_scope(instance.post_id)])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.shift_post_comments(instance.post_id, -1)
+    caching.bump_versions([caching.post_scope(instance.post_id)])
+
+
+def _shown(instance, fields):
+    return tuple(getattr(instance, name) for name in fields)
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._saved_shown = None
+        return
+    instance._saved_shown = Group.objects.filter(
+        pk=instance.pk
+    ).values_list(*GROUP_SHOWN_FIELDS).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created or instance._saved_shown == _shown(
+        instance, GROUP_SHOWN_FIELDS
+    ):
+        return
+    caching.bump_versions(caching.group_scopes(instance.pk))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления посты уже без группы: области собираются заранее.
+    instance._scopes = caching.group_scopes(instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    caching.bump_versions(instance._scopes)
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, **kwargs):
+    # Вход пользователя сохраняет только last_login.
+    update_fields = kwargs.get('update_fields')
+    if instance.pk is None or update_fields and not (
+        set(update_fields) & set(USER_SHOWN_FIELDS)
+    ):
+        instance._saved_shown = _shown(instance, USER_SHOWN_FIELDS)
+        return
+    instance._saved_shown = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*USER_SHOWN_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created or instance._saved_shown == _shown(
+        instance, USER_SHOWN_FIELDS
+    ):
+        return
+    caching.bump_versions(caching.user_scopes(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    caching.bump_versions([caching.author_scope(instance.pk)])
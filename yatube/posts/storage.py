@@ -0,0 +1,82 @@
+"""Контентно-адресуемое хранилище картинок постов.
+
+Файл называется по SHA-256 содержимого и лежит в двух уровнях
+подкаталогов по первым символам хэша: posts/ab/cd/abcd....jpg.
+Повторная загрузка той же картинки получает то же имя и не пишется
+на диск второй раз, а только получает свежее время изменения; число
+ссылок на файл ведёт posts.media.
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(
+    r'(^|/)(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/'
+    r'(?P=a)(?P=b)[0-9a-f]{60}(\.\w+)?$'
+)
+
+
+class AlreadyStored(Exception):
+    """Файл с таким содержимым уже записан, в том числе параллельно."""
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    @staticmethod
+    def is_content_addressed(name):
+        return bool(HASHED_NAME.search(name or ''))
+
+    @staticmethod
+    def content_name(name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        value = digest.hexdigest()
+        dirname, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return posixpath.join(
+            dirname, value[:2], value[2:4], value + extension
+        )
+
+    def get_available_name(self, name, max_length=None):
+        if not self.is_content_addressed(name):
+            return super().get_available_name(name, max_length)
+        if max_length is not None and len(name) > max_length:
+            raise SuspiciousFileOperation(
+                'Storage can not find an available filename for "%s".' % name
+            )
+        if self.exists(name):
+            raise AlreadyStored(name)
+        return name
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        while True:
+            try:
+                return super().save(name, content, max_length)
+            except AlreadyStored:
+                pass
+            # Свежее время изменения не даёт сборщику мусора удалить
+            # файл, пока пост с новой ссылкой на него не закоммичен.
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                # Сборщик успел удалить файл: записываем его заново.
+                continue
+            return name
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,22 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts, name='feed'):
+    """Готовые миниатюры всей страницы ленты одним обращением."""
+    thumbnails.prefetch(posts, name)
+    return ''
+
+
+@register.simple_tag
+def post_thumbnail(post, name='feed'):
+    return thumbnails.post_thumbnail(post, name)
+
+
+@register.simple_tag
+def post_image(post, name='feed'):
+    return thumbnails.post_image(post, name)
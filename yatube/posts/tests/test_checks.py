@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import check_feed_version_cache
+
+LOCAL_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+FILE_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/yatube-cache',
+    }
+}
+
+
+class FeedVersionCacheCheckTests(SimpleTestCase):
+    def test_endless_versions_need_shared_cache(self):
+        cases = (
+            (LOCAL_CACHE, None, ['posts.E001']),
+            (LOCAL_CACHE, 20, []),
+            (FILE_CACHE, None, []),
+        )
+        for caches, timeout, expected in cases:
+            with self.subTest(caches=caches, timeout=timeout):
+                with override_settings(
+                    CACHES=caches, FEED_VERSION_TIMEOUT=timeout
+                ):
+                    errors = check_feed_version_cache(None)
+                self.assertEqual([error.id for error in errors], expected)
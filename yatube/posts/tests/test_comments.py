@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..views import NUMBER_COMMENTS
+
+User = get_user_model()
+COUNT_COMMENTS = NUMBER_COMMENTS + 5
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        for number in range(COUNT_COMMENTS):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.id}
+        )
+        cls.fragment_url = reverse(
+            'posts:post_comments', kwargs={'post_id': cls.post.id}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def test_detail_shows_first_batch(self):
+        response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(
+            self.texts(comments),
+            [f'Комментарий {number}' for number in range(NUMBER_COMMENTS)]
+        )
+        self.assertContains(response, f'Комментарии: {COUNT_COMMENTS}')
+        self.assertContains(
+            response, f'{self.fragment_url}?comments={comments.next_cursor}'
+        )
+
+    def test_fragment_returns_next_batch(self):
+        first = self.client.get(self.detail_url).context['comments']
+        response = self.client.get(
+            self.fragment_url, {'comments': first.next_cursor}
+        )
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        rest = response.context['comments']
+        self.assertEqual(
+            self.texts(rest),
+            [
+                f'Комментарий {number}'
+                for number in range(NUMBER_COMMENTS, COUNT_COMMENTS)
+            ]
+        )
+        self.assertIsNone(rest.next_cursor)
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_detail_accepts_comments_cursor(self):
+        first = self.client.get(self.detail_url).context['comments']
+        response = self.client.get(
+            self.detail_url, {'comments': first.next_cursor}
+        )
+        self.assertEqual(
+            len(response.context['comments']),
+            COUNT_COMMENTS - NUMBER_COMMENTS
+        )
+
+    def test_fragment_of_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,135 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, UserCounter
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def counter(self, user):
+        return UserCounter.objects.get(user=user)
+
+    def test_post_counters(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        self.assertEqual(self.counter(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.counter(self.author).posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_follow_counters(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.counter(self.author).followers_count, 1)
+        self.assertEqual(self.counter(self.reader).following_count, 1)
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.counter(self.author).followers_count, 0)
+        self.assertEqual(self.counter(self.reader).following_count, 0)
+
+    def test_comment_counter(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_delete_with_drifted_counters(self):
+        """Удаление не падает, если счётчик уже отстал от таблицы."""
+        # bulk_create не шлёт сигналов: счётчики остаются нулями.
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Без сигналов', group=self.group)
+        ])
+        post = Post.objects.get(group=self.group)
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.reader, text='Без сигналов')
+        ])
+        Comment.objects.get().delete()
+        post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_pages_show_counters(self):
+        Post.objects.create(author=self.author, text='Пост', group=self.group)
+        # Счётчик расходится с таблицей: страницы его не пересчитывают.
+        UserCounter.objects.filter(user=self.author).update(posts_count=7)
+        Group.objects.filter(id=self.group.id).update(posts_count=7)
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 7)
+        response = client.get(reverse('posts:group_list', args=['group']))
+        self.assertEqual(response.context['page_obj'].paginator.count, 7)
+
+    def test_recount_fixes_drift(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserCounter.objects.update(
+            posts_count=5, followers_count=5, following_count=5
+        )
+        Group.objects.update(posts_count=5)
+        Post.objects.update(comments_count=5)
+        UserCounter.objects.filter(user=self.reader).delete()
+
+        out = StringIO()
+        call_command('recount', batch_size=1, stdout=out)
+        self.assertIn('users: исправлено строк 2', out.getvalue())
+        self.assertIn('groups: исправлено строк 2', out.getvalue())
+        self.assertIn('posts: исправлено строк 1', out.getvalue())
+
+        author = self.counter(self.author)
+        self.assertEqual(
+            (author.posts_count, author.followers_count,
+             author.following_count),
+            (1, 1, 0)
+        )
+        self.assertEqual(self.counter(self.reader).following_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        out = StringIO()
+        call_command('recount', 'posts', stdout=out)
+        self.assertEqual(out.getvalue(), 'posts: исправлено строк 0\n')
@@ -0,0 +1,220 @@
+import json
+from datetime import timedelta
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import caching, events
+from ..models import ChangeEvent, Comment, Group, Post
+
+User = get_user_model()
+
+
+def parse(lines):
+    """Имена и данные событий из строк потока."""
+    parsed = []
+    for line in lines:
+        fields = dict(
+            part.split(': ', 1) for part in line.strip().split('\n')
+            if ': ' in part and not part.startswith(':')
+        )
+        if 'event' in fields:
+            parsed.append((fields['event'], json.loads(fields['data'])))
+    return parsed
+
+
+@override_settings(EVENTS_HEARTBEAT=0.01)
+class EventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='leo')
+        cls.group = Group.objects.create(
+            title='Коты', slug='cats', description='Про котов'
+        )
+
+    def setUp(self):
+        self.broker = events.Broker(poll_interval=0)
+        self.start = self.broker.current_id()
+
+    def read(self, scopes, last_id=None, broker=None):
+        return list(events.stream(
+            scopes, self.start if last_id is None else last_id,
+            source=broker or self.broker, duration=0.05
+        ))
+
+    def test_records_posts_and_comments(self):
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        Comment.objects.create(post=post, author=self.author, text='Да')
+        post.text = 'Правка'
+        post.save()
+        self.assertEqual(
+            list(ChangeEvent.objects.values_list('kind', 'post_id')),
+            [(ChangeEvent.POST, post.id), (ChangeEvent.COMMENT, post.id)]
+        )
+
+    def test_scopes(self):
+        plain = Post.objects.create(author=self.author, text='Без группы')
+        grouped = Post.objects.create(
+            author=self.author, group=self.group, text='В группе'
+        )
+        Comment.objects.create(post=plain, author=self.author, text='Да')
+        cases = {
+            caching.INDEX: [('post', plain.id), ('post', grouped.id)],
+            caching.group_scope(self.group.id): [('post', grouped.id)],
+            caching.post_scope(plain.id): [('comment', plain.id)],
+        }
+        for scope, expected in cases.items():
+            with self.subTest(scope=scope):
+                received = parse(self.read({scope}))
+                self.assertEqual(
+                    [(name, data['post']) for name, data in received],
+                    expected
+                )
+
+    def test_stream_starts_with_retry_and_pings(self):
+        lines = self.read({caching.INDEX})
+        self.assertTrue(lines[0].startswith('retry: '))
+        self.assertIn(': ping\n\n', lines)
+
+    def test_resume_from_journal(self):
+        posts = [
+            Post.objects.create(author=self.author, text=str(number))
+            for number in range(3)
+        ]
+        # Новый процесс: в буфере брокера пропущенных событий нет.
+        fresh = events.Broker(poll_interval=0)
+        fresh.current_id()
+        received = parse(self.read({caching.INDEX}, broker=fresh))
+        self.assertEqual(
+            [data['post'] for name, data in received],
+            [post.id for post in posts]
+        )
+
+    def test_reset_when_too_far_behind(self):
+        broker = events.Broker(buffer_size=2, poll_interval=0)
+        broker.current_id()
+        for number in range(3):
+            Post.objects.create(author=self.author, text=str(number))
+        while broker.last_id < ChangeEvent.objects.latest('id').id:
+            broker.refresh(0)
+        received = parse(self.read({caching.INDEX}, broker=broker))
+        self.assertEqual(received, [('reset', {})])
+
+    def test_prune(self):
+        Post.objects.create(author=self.author, text='Старый')
+        Post.objects.create(author=self.author, text='Новый')
+        old = ChangeEvent.objects.earliest('id')
+        ChangeEvent.objects.filter(id=old.id).update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        with override_settings(EVENTS_KEEP=86400):
+            self.assertEqual(events.prune(), 1)
+        self.assertFalse(ChangeEvent.objects.filter(id=old.id).exists())
+
+    def test_prune_keeps_ids_growing(self):
+        Post.objects.create(author=self.author, text='Старый')
+        Post.objects.create(author=self.author, text='Тоже старый')
+        latest = ChangeEvent.objects.latest('id')
+        ChangeEvent.objects.update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        with override_settings(EVENTS_KEEP=86400):
+            self.assertEqual(events.prune(), 1)
+        self.assertEqual(
+            list(ChangeEvent.objects.values_list('id', flat=True)),
+            [latest.id]
+        )
+        Post.objects.create(author=self.author, text='Новый')
+        self.assertGreater(ChangeEvent.objects.latest('id').id, latest.id)
+
+
+@override_settings(EVENTS_HEARTBEAT=0.01, EVENTS_STREAM_DURATION=0.05)
+class EventStreamViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='leo')
+        cls.group = Group.objects.create(
+            title='Коты', slug='cats', description='Про котов'
+        )
+
+    def setUp(self):
+        patcher = mock.patch.object(
+            events, 'broker', events.Broker(poll_interval=0)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stream_with_last_event_id(self):
+        start = events.broker.current_id()
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        response = self.client.get(
+            reverse('posts:events'), {'group': 'cats'},
+            HTTP_LAST_EVENT_ID=str(start)
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        lines = [line.decode() for line in response.streaming_content]
+        self.assertEqual(
+            [(name, data['post']) for name, data in parse(lines)],
+            [('post', post.id)]
+        )
+
+    def test_bad_parameters(self):
+        url = reverse('posts:events')
+        cases = (
+            ({'group': 'dogs'}, {}, HTTPStatus.NOT_FOUND),
+            ({'author': 'nobody'}, {}, HTTPStatus.NOT_FOUND),
+            ({'post': 'x'}, {}, HTTPStatus.BAD_REQUEST),
+            ({}, {'HTTP_LAST_EVENT_ID': 'x'}, HTTPStatus.BAD_REQUEST),
+        )
+        for params, headers, status in cases:
+            with self.subTest(params=params, headers=headers):
+                response = self.client.get(url, params, **headers)
+                self.assertEqual(response.status_code, status)
+
+    def test_pages_subscribe_on_request(self):
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        pages = {
+            reverse('posts:index'): "'/events/'",
+            reverse('posts:group_list', args=['cats']): '?group=cats',
+            reverse('posts:profile', args=['leo']): '?author=leo',
+            reverse('posts:post_detail', args=[post.id]):
+                f'?post={post.id}',
+        }
+        for url, expected in pages.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, expected)
+                self.assertContains(
+                    response, "button.addEventListener('click', follow)"
+                )
+
+    @override_settings(EVENTS_MAX_STREAMS=1)
+    def test_streams_limit(self):
+        url = reverse('posts:events')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, HTTPStatus.OK)
+        second = self.client.get(url)
+        self.assertEqual(
+            second.status_code, HTTPStatus.SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(second['Retry-After'], '3')
+        self.assertTrue(second.content.startswith(b'retry: '))
+        # Закрытый, даже не начатый поток освобождает место.
+        first.close()
+        third = self.client.get(url)
+        self.assertEqual(third.status_code, HTTPStatus.OK)
+        list(third.streaming_content)
+        third.close()
+        self.assertEqual(events.streams.count, 0)
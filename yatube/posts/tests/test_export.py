@@ -0,0 +1,167 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..export import TABLES, export
+from ..models import Comment, Follow, Post
+
+User = get_user_model()
+START = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='leo')
+        cls.reader = User.objects.create_user(username='ann')
+        cls.staff = User.objects.create_user(username='boss', is_staff=True)
+        # Две пары постов с одинаковой датой проверяют ключ (дата, id).
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Пост {i}') for i in range(5)
+        ])
+        Post.objects.update(pub_date=START)
+        Post.objects.filter(text__in=['Пост 3', 'Пост 4']).update(
+            pub_date=START + timedelta(days=1)
+        )
+        post = Post.objects.get(text='Пост 0')
+        Comment.objects.create(post=post, author=cls.reader, text='Ура')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def rows(self, table, since_id=None, chunk_size=2, since_date=None):
+        exported = TABLES[table]
+        data = b''.join(export(
+            exported, since_id=since_id, until=exported.watermark(),
+            chunk_size=chunk_size, since_date=since_date
+        ))
+        return [json.loads(line) for line in data.decode().splitlines()]
+
+    def test_keyset_chunks_cover_table(self):
+        for chunk_size in (1, 2, 10):
+            with self.subTest(chunk_size=chunk_size):
+                rows = self.rows('posts', chunk_size=chunk_size)
+                self.assertEqual(
+                    [row['text'] for row in rows],
+                    [f'Пост {i}' for i in range(5)]
+                )
+        self.assertEqual(len(self.rows('comments')), 1)
+        self.assertEqual(self.rows('follows')[0]['user_id'], self.reader.id)
+
+    def test_incremental_after_watermark(self):
+        table = TABLES['posts']
+        first = Post.objects.get(text='Пост 1')
+        since_id, since_date = table.parse_since(since_id=first.id)
+        self.assertEqual(
+            [row['text'] for row in self.rows('posts', since_id)],
+            ['Пост 2', 'Пост 3', 'Пост 4']
+        )
+        since_id, since_date = table.parse_since(
+            (START + timedelta(days=1)).isoformat()
+        )
+        self.assertEqual(
+            len(self.rows('posts', since_id, since_date=since_date)), 2
+        )
+        with self.assertRaises(ValueError):
+            TABLES['follows'].parse_since(START.isoformat())
+
+    def test_imported_old_rows_are_not_skipped(self):
+        table = TABLES['posts']
+        until = table.watermark()
+        # Импорт вставляет посты с датами из прошлого.
+        Post.objects.create(author=self.author, text='Импортированный')
+        Post.objects.filter(text='Импортированный').update(
+            pub_date=START - timedelta(days=365)
+        )
+        self.assertEqual(
+            [row['text'] for row in self.rows('posts', until)],
+            ['Импортированный']
+        )
+
+    def test_chunks_seek_by_primary_key(self):
+        for table in TABLES.values():
+            with self.subTest(table=table.model.__name__):
+                until = table.watermark()
+                with CaptureQueriesContext(connection) as queries:
+                    list(table.rows(0, until, chunk_size=1))
+                for query in queries:
+                    with connection.cursor() as cursor:
+                        cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                        plan = ' / '.join(
+                            row[-1] for row in cursor.fetchall()
+                        )
+                    self.assertIn('USING INTEGER PRIMARY KEY', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_rows_after_start_are_left_for_next_export(self):
+        table = TABLES['posts']
+        until = table.watermark()
+        Post.objects.create(author=self.author, text='Новый')
+        rows = b''.join(export(table, until=until)).decode().splitlines()
+        self.assertEqual(len(rows), 5)
+
+    def test_command_state_and_gzip(self):
+        directory = tempfile.mkdtemp()
+        state = os.path.join(directory, 'state.json')
+        output = os.path.join(directory, 'posts.csv.gz')
+        options = {'state': state, 'output': output, 'gzip': True,
+                   'file_format': 'csv', 'stderr': StringIO()}
+        call_command('export_data', 'posts', **options)
+        with gzip.open(output, 'rt', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 5)
+        with open(state) as file:
+            saved = json.load(file)['posts']
+        self.assertEqual(saved['since_id'], int(rows[-1]['id']))
+
+        Post.objects.create(author=self.author, text='Новый')
+        call_command('export_data', 'posts', **options)
+        with gzip.open(output, 'rt', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual([row['text'] for row in rows], ['Новый'])
+
+        call_command('export_data', 'posts', **options)
+        with gzip.open(output, 'rt', encoding='utf-8') as file:
+            self.assertEqual(file.read().strip(), ','.join(
+                TABLES['posts'].fields
+            ))
+
+    def test_endpoint_is_staff_only(self):
+        url = reverse('posts:export', args=['posts'])
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_endpoint_streams(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:export', args=['comments']), {'gzip': '1'}
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        data = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(json.loads(data)['text'], 'Ура')
+        comment = Comment.objects.get()
+        self.assertIn(f'since_id={comment.id}', response['X-Export-Watermark'])
+
+    def test_endpoint_errors(self):
+        self.client.force_login(self.staff)
+        for url, status in (
+            (reverse('posts:export', args=['users']), HTTPStatus.NOT_FOUND),
+            (reverse('posts:export', args=['posts']) + '?format=xml',
+             HTTPStatus.NOT_FOUND),
+            (reverse('posts:export', args=['posts']) + '?since=вчера',
+             HTTPStatus.BAD_REQUEST),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, status)
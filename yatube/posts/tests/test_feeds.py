@@ -0,0 +1,107 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import query_budget
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Коты', slug='cats', description='Про котов'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый пост\nдалее'
+        )
+        Post.objects.create(author=cls.author, text='Без группы')
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        return {
+            reverse('posts:index_rss'): 2,
+            reverse('posts:index_atom'): 2,
+            reverse('posts:group_rss', args=['cats']): 1,
+            reverse('posts:group_atom', args=['cats']): 1,
+            reverse('posts:profile_rss', args=['leo']): 2,
+            reverse('posts:profile_atom', args=['leo']): 2,
+        }
+
+    def test_feeds(self):
+        for url, count in self.urls().items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                content = response.content.decode()
+                tag = '<entry>' if 'atom' in url else '<item>'
+                self.assertEqual(content.count(tag), count)
+                self.assertIn('Первый пост', content)
+                self.assertIn(
+                    reverse('posts:post_detail', args=[self.post.id]),
+                    content
+                )
+
+    def test_missing_group_or_author(self):
+        for url in (
+            reverse('posts:group_rss', args=['dogs']),
+            reverse('posts:profile_atom', args=['nobody']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.client.get(url).status_code, HTTPStatus.NOT_FOUND
+                )
+
+    def test_conditional_get_skips_posts(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response['ETag']
+                last_modified = response['Last-Modified']
+                # По выборке группы или автора на запрос, без постов.
+                with query_budget(2) as queries:
+                    for headers in (
+                        {'HTTP_IF_NONE_MATCH': etag},
+                        {'HTTP_IF_MODIFIED_SINCE': last_modified},
+                    ):
+                        response = self.client.get(url, **headers)
+                        self.assertEqual(
+                            response.status_code, HTTPStatus.NOT_MODIFIED
+                        )
+                self.assertFalse(any(
+                    'posts_post' in query['sql']
+                    for query in queries.captured_queries
+                ))
+
+    def test_new_post_changes_etag(self):
+        url = reverse('posts:group_atom', args=['cats'])
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.author, group=self.group, text='Ещё')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('Ещё', response.content.decode())
+
+    def test_feed_is_shared_by_logged_in_users(self):
+        url = reverse('posts:index_rss')
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_pages_link_feeds(self):
+        response = self.client.get(reverse('posts:group_list', args=['cats']))
+        self.assertContains(
+            response, reverse('posts:group_atom', args=['cats'])
+        )
+        self.assertContains(response, 'application/rss+xml')
@@ -83,7 +83,9 @@ class PostFormTests(TestCase):
             Post.objects.filter(
                 group=self.group.id,
                 text='Тестовый текст',
-                image='posts/small.gif'
+                image__regex=(
+                    r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
+                )
             ).exists()
         )
         self.assertEqual(Post.objects.count(), post_count + 1)
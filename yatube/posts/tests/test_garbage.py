@@ -0,0 +1,168 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from sorl.thumbnail.models import KVStore
+
+from .. import thumbnails
+from ..models import MediaFile, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+HOUR_AGO = time.time() - 3600 - 60
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True)
+class MediaGarbageTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, content=SMALL_GIF):
+        post = Post.objects.create(
+            author=self.user, text='Пост',
+            image=SimpleUploadedFile('small.gif', content)
+        )
+        thumbnails.generate(post.id)
+        return post
+
+    def write(self, name, mtime=HOUR_AGO):
+        path = os.path.join(TEMP_MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(b'garbage')
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def files(self, directory):
+        result = set()
+        top = os.path.join(TEMP_MEDIA_ROOT, directory)
+        for root, _, names in os.walk(top):
+            result.update(os.path.join(root, name) for name in names)
+        return result
+
+    def age_files(self):
+        for path in self.files(''):
+            os.utime(path, (HOUR_AGO, HOUR_AGO))
+
+    def collect(self, **options):
+        out = StringIO()
+        call_command('collect_media_garbage', stdout=out, **options)
+        return out.getvalue()
+
+    def test_live_files_are_kept(self):
+        self.create_post()
+        self.age_files()
+        before = self.files('')
+        self.assertTrue(self.files('cache'))
+        self.collect(batch_size=2)
+        self.assertEqual(self.files(''), before)
+
+    def test_orphans_are_deleted(self):
+        self.create_post()
+        self.age_files()
+        live = self.files('')
+        orphans = {
+            self.write('posts/00/00/lost.gif'),
+            self.write('posts/flat.jpg'),
+            self.write('cache/ab/cd/abcdef.jpg'),
+        }
+        fresh = self.write('posts/new.gif', mtime=time.time())
+        out = self.collect(batch_size=2)
+        self.assertEqual(self.files(''), live | {fresh})
+        self.assertIn('удалено: 3 (21 байт)', out)
+        for path in orphans:
+            self.assertFalse(os.path.exists(path))
+
+    def test_reused_orphan_is_kept(self):
+        orphans = [
+            self.write('posts/00/00/first.gif'),
+            self.write('posts/00/00/second.gif'),
+        ]
+
+        def reuse(seconds):
+            # Пока сборщик ждёт, на оставшийся файл снова сослались.
+            MediaFile.objects.create(name='posts/00/00/first.gif', refs=1)
+            MediaFile.objects.create(name='posts/00/00/second.gif', refs=1)
+
+        with mock.patch('posts.garbage.time.sleep', side_effect=reuse):
+            out = self.collect(rate=10)
+        self.assertIn('удалено: 1', out)
+        self.assertEqual(
+            [os.path.exists(path) for path in orphans].count(True), 1
+        )
+
+    def test_refreshed_orphan_is_kept(self):
+        orphans = [
+            self.write('posts/00/00/first.gif'),
+            self.write('posts/00/00/second.gif'),
+        ]
+
+        def refresh(seconds):
+            for path in orphans:
+                if os.path.exists(path):
+                    os.utime(path)
+
+        with mock.patch('posts.garbage.time.sleep', side_effect=refresh):
+            out = self.collect(rate=10)
+        self.assertIn('удалено: 1', out)
+
+    def test_dry_run_keeps_everything(self):
+        self.write('posts/flat.jpg')
+        out = self.collect(dry_run=True)
+        self.assertIn('будет удалено: 1', out)
+        self.assertTrue(self.files('posts'))
+
+    def test_stale_kvstore_entries_and_thumbnails(self):
+        kept = self.create_post()
+        lost = self.create_post(SMALL_GIF + b'\0')
+        self.age_files()
+        thumbnail_files = len(self.files('cache'))
+        entries = KVStore.objects.count()
+        # Ссылка пропала в обход сигналов: файл, миниатюры и записи
+        # sorl остались без владельца.
+        Post.objects.filter(id=lost.id).update(image='')
+        MediaFile.objects.filter(name=lost.image.name).delete()
+
+        out = self.collect()
+        self.assertIn(f'записей sorl: {entries // 2}', out)
+        self.assertEqual(KVStore.objects.count(), entries // 2)
+        self.assertEqual(len(self.files('cache')), thumbnail_files // 2)
+        self.assertFalse(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, lost.image.name))
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, kept.image.name))
+        )
+        self.assertIn('удалено: 0 (0 байт), записей sorl: 0', self.collect())
+
+    def test_deleted_post_takes_thumbnails_along(self):
+        post = self.create_post()
+        self.assertTrue(self.files('cache'))
+        post.delete()
+        self.assertEqual(self.files(''), set())
+        self.assertEqual(KVStore.objects.count(), 0)
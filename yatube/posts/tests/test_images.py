@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..forms import PostForm
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+# Тег EXIF Orientation: 6 — повернуть на 90° по часовой стрелке.
+ORIENTATION = 0x0112
+
+
+def image_file(name, image_format='JPEG', size=(400, 200), mode='RGB',
+               **save_options):
+    output = BytesIO()
+    Image.new(mode, size, 'red').save(output, image_format, **save_options)
+    return SimpleUploadedFile(name, output.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIDE=100)
+class ImageIngestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def form(self, upload):
+        return PostForm(data={'text': 'Пост'}, files={'image': upload})
+
+    def test_downscaled_rotated_and_stripped(self):
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        exif[0x010F] = 'Камера'
+        form = self.form(image_file('photo.jpg', exif=exif.tobytes()))
+        self.assertTrue(form.is_valid(), form.errors)
+        stored = form.cleaned_data['image']
+        self.assertEqual(stored.name, 'photo.jpg')
+        image = Image.open(stored)
+        self.assertEqual(image.size, (50, 100))
+        self.assertFalse(image.getexif())
+
+    def test_color_profile_is_kept(self):
+        # Pillow не разбирает профиль при записи: хватает любых байтов.
+        profile = b'icc profile' * 10
+        for name, image_format in (('photo.jpg', 'JPEG'),
+                                   ('logo.png', 'PNG')):
+            with self.subTest(image_format=image_format):
+                exif = Image.Exif()
+                exif[0x010F] = 'Камера'
+                form = self.form(image_file(
+                    name, image_format, icc_profile=profile,
+                    exif=exif.tobytes()
+                ))
+                self.assertTrue(form.is_valid(), form.errors)
+                image = Image.open(form.cleaned_data['image'])
+                self.assertEqual(image.info.get('icc_profile'), profile)
+                self.assertFalse(image.getexif())
+
+    def test_png_keeps_format_and_alpha(self):
+        form = self.form(image_file('logo.png', 'PNG', mode='RGBA'))
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual((image.format, image.mode), ('PNG', 'RGBA'))
+        self.assertEqual(image.size, (100, 50))
+
+    def test_rejects_before_decoding(self):
+        cases = (
+            ({'POST_IMAGE_MAX_UPLOAD_SIZE': 10}, 'Файл больше'),
+            ({'POST_IMAGE_MAX_PIXELS': 1000}, 'слишком большое'),
+        )
+        for overrides, message in cases:
+            with self.subTest(message=message), \
+                    override_settings(**overrides):
+                form = self.form(image_file('photo.jpg'))
+                self.assertFalse(form.is_valid())
+                self.assertIn(message, form.errors['image'][0])
+
+    def test_rejects_unsupported_format(self):
+        form = self.form(image_file('picture.bmp', 'BMP'))
+        self.assertFalse(form.is_valid())
+        self.assertIn('BMP не поддерживается', form.errors['image'][0])
+
+    def test_post_create_stores_normalized_image(self):
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с фото',
+            'image': image_file('big.jpg', size=(1000, 500)),
+        })
+        post = Post.objects.get(text='Пост с фото')
+        self.assertRegex(post.image.name, r'^posts/.+\.jpg$')
+        self.assertEqual((post.image.width, post.image.height), (100, 50))
+
+    def test_edit_keeps_stored_image(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image='posts/missing.jpg'
+        )
+        form = PostForm(data={'text': 'Новый текст'}, instance=post)
+        self.assertTrue(form.is_valid(), form.errors)
@@ -0,0 +1,189 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from .. import search
+from ..importer import Importer
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ImportPostsTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='leo')
+        self.reader = User.objects.create_user(username='ann')
+        self.group = Group.objects.create(
+            title='Коты', slug='cats', description='Про котов'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def write(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def jsonl(self, records):
+        return self.write(
+            '.jsonl', '\n'.join(json.dumps(record) for record in records)
+        )
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_posts', path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_jsonl(self):
+        records = [
+            {
+                'author': 'leo', 'group': 'cats', 'text': f'Старый пост {i}',
+                'pub_date': f'2019-05-0{i + 1}T10:00:00+00:00',
+                'comments': [
+                    {'author': 'ann', 'text': 'Коммент',
+                     'created': '2019-06-01T10:00:00'},
+                ],
+            }
+            for i in range(5)
+        ]
+        out, _ = self.run_import(
+            self.jsonl(records), batch_size=2, chunk_size=2
+        )
+        self.assertIn('Импортировано постов: 5, комментариев: 5', out)
+        self.assertIn('строк/с', out)
+
+        post = Post.objects.get(text='Старый пост 0')
+        self.assertEqual(
+            post.pub_date, datetime(2019, 5, 1, 10, tzinfo=dt_timezone.utc)
+        )
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.comments_count, 1)
+        comment = Comment.objects.get(post=post)
+        self.assertEqual(comment.author, self.reader)
+        self.assertEqual(comment.created.year, 2019)
+
+        self.author.counters.refresh_from_db()
+        self.assertEqual(self.author.counters.posts_count, 5)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 5)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 5
+        )
+        self.assertEqual(search.search_posts('старый').count(), 5)
+
+    def test_auto_now_add_is_restored(self):
+        self.run_import(self.jsonl([{
+            'author': 'leo', 'text': 'Пост', 'pub_date': '2019-05-01T10:00',
+        }]))
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(post.pub_date.year, datetime.now().year)
+        self.assertEqual(search.search_posts('новый').count(), 1)
+
+    def test_import_csv_with_missing_authors(self):
+        path = self.write(
+            '.csv',
+            'author,text,group,pub_date\n'
+            'leo,Первый,,\n'
+            'newbie,Второй,dogs,2020-01-01T00:00:00Z\n'
+        )
+        _, err = self.run_import(path)
+        self.assertIn('Строка 3: Нет пользователя newbie', err)
+        self.assertEqual(Post.objects.count(), 1)
+
+        Post.objects.all().delete()
+        self.run_import(path, create_missing=True)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertTrue(Group.objects.filter(slug='dogs').exists())
+        newbie = User.objects.get(username='newbie')
+        self.assertFalse(newbie.has_usable_password())
+
+    def test_invalid_rows_are_skipped(self):
+        path = self.write('.jsonl', '\n'.join([
+            '{"author": "leo", "text": "Хороший"}',
+            'не json',
+            '{"author": "leo", "text": ""}',
+            '{"author": "leo", "text": "Дата", "pub_date": "вчера"}',
+            '[1, 2]',
+        ]))
+        out, err = self.run_import(path)
+        self.assertIn('пропущено: 4', out)
+        self.assertIn('Строка 2: Неверный JSON', err)
+        self.assertIn('Строка 4: Неверная дата вчера', err)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_drop_indexes(self):
+        self.run_import(
+            self.jsonl([{'author': 'leo', 'text': 'Пост'}]), drop_indexes=True
+        )
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        self.assertIn('post_author_pub_date_idx', indexes)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_post_created_after_import_is_indexed_once(self):
+        importer = Importer()
+        finish = importer.finish
+
+        def finish_later(*args):
+            # Пост из веб-запроса: триггер индекса уже вернулся.
+            Post.objects.create(author=self.author, text='Параллельный')
+            finish(*args)
+
+        with mock.patch.object(importer, 'finish', finish_later):
+            importer.run(iter([(1, {'author': 'leo', 'text': 'Импорт'})]))
+        self.assertEqual(search.search_posts('параллельный').count(), 1)
+        self.assertEqual(search.search_posts('импорт').count(), 1)
+        # Повторно добавленный пост ломает сверку индекса с таблицей.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}, rank) "
+                "VALUES ('integrity-check', 1)"
+            )
+
+    def test_interrupted_import_is_finished(self):
+        records = [
+            (number, {'author': 'leo', 'text': f'Прерванный {number}'})
+            for number in range(4)
+        ]
+        importer = Importer(batch_size=2, chunk_size=1, drop_indexes=True)
+        insert = importer.insert
+        calls = []
+
+        def failing_insert(rows):
+            calls.append(rows)
+            if len(calls) > 1:
+                raise RuntimeError('Сбой посреди импорта')
+            insert(rows)
+
+        with mock.patch.object(importer, 'insert', failing_insert):
+            with self.assertRaises(RuntimeError):
+                importer.run(iter(records))
+        self.assertEqual(search.search_posts('прерванный').count(), 2)
+        self.author.counters.refresh_from_db()
+        self.assertEqual(self.author.counters.posts_count, 2)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        self.assertIn('post_author_pub_date_idx', indexes)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(search.search_posts('новый').count(), 1)
+        self.assertEqual(post.pub_date.year, datetime.now().year)
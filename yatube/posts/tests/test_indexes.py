@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import timeline
+from ..paginators import (
+    COMMENT_ORDERING, FEED_ORDERING, CursorPaginator
+)
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class FeedQueryPlanTests(TestCase):
+    """Запросы лент идут по индексам без сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {i}', group=cls.group
+            )
+            for i in range(3)
+        ]
+        cls.post = posts[0]
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return ' / '.join(row[-1] for row in cursor.fetchall())
+
+    def assert_plans_avoid(self, urls, forbidden):
+        for url in urls:
+            for params in ({}, {'cursor': ''}):
+                with self.subTest(url=url, params=params):
+                    with CaptureQueriesContext(connection) as queries:
+                        self.authorized_client.get(url, params)
+                    for query in queries:
+                        if not query['sql'].startswith('SELECT'):
+                            continue
+                        plan = self.query_plan(query['sql'])
+                        self.assertNotIn(
+                            forbidden, plan, f"{query['sql']}\n{plan}"
+                        )
+
+    def test_feed_queries_use_indexes(self):
+        self.assert_plans_avoid((
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ), 'TEMP B-TREE')
+
+    @override_settings(TIMELINE_PULL_THRESHOLD=1)
+    def test_pulled_follow_feed_uses_indexes(self):
+        """Посты pull-авторов подмешиваются через OR по двум индексам.
+
+        Слитый результат сортируется во временном B-дереве — цена
+        ленты без записи при чтении, — но таблица постов целиком
+        не читается.
+        """
+        timeline.update_strategy(self.author.id)
+        self.assert_plans_avoid(
+            (reverse('posts:follow_index'),), 'SCAN posts_post'
+        )
+
+    def test_cursor_seek_searches_index(self):
+        """Страница по курсору ищет начало в индексе, а не читает его."""
+        Comment.objects.create(post=self.post, author=self.user, text='Ещё')
+        posts = Post.objects.select_related('author', 'group')
+        cases = (
+            (posts, FEED_ORDERING, '(pub_date<?)'),
+            (self.post.comments.all(), COMMENT_ORDERING, 'created>?'),
+        )
+        for queryset, ordering, bound in cases:
+            with self.subTest(ordering=ordering):
+                paginator = CursorPaginator(queryset, 1, ordering)
+                cursor = paginator.page().next_cursor
+                with CaptureQueriesContext(connection) as queries:
+                    paginator.page(cursor)
+                plan = self.query_plan(queries[-1]['sql'])
+                self.assertIn('SEARCH', plan)
+                self.assertIn(bound, plan)
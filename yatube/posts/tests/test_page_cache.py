@@ -0,0 +1,135 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_guest_gets_cached_page_with_validators(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                self.assertIn('ETag', first)
+                self.assertIn('Last-Modified', first)
+                with self.assertNumQueries(1 if url != '/' else 0):
+                    second = self.guest_client.get(url)
+                self.assertEqual(first.content, second.content)
+
+    def test_revalidation_returns_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                by_etag = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(by_etag.status_code, HTTPStatus.NOT_MODIFIED)
+                by_date = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(by_date.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_changes_invalidate_page(self):
+        for url in self.urls:
+            self.guest_client.get(url)
+        post = Post.objects.get(id=self.post.id)
+        post.text = 'Изменённый пост'
+        post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Изменённый')
+
+    def test_group_edit_invalidates_pages(self):
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        group = Group.objects.get(id=self.group.id)
+        group.title = 'Новое название группы'
+        group.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+        for url in self.urls[1], self.urls[3]:
+            self.assertContains(
+                self.guest_client.get(url), 'Новое название группы'
+            )
+
+    def test_user_name_edit_invalidates_pages(self):
+        reader = User.objects.create_user(username='Reader')
+        Comment.objects.create(post=self.post, author=reader, text='Да')
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        author = User.objects.get(id=self.user.id)
+        author.first_name = 'Лев'
+        author.last_name = 'Толстой'
+        author.save()
+        reader.username = 'Renamed'
+        reader.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+        for url in self.urls[:3]:
+            self.assertContains(self.guest_client.get(url), 'Лев Толстой')
+        self.assertContains(self.guest_client.get(self.urls[3]), 'Renamed')
+
+    def test_login_keeps_pages(self):
+        self.user.set_password('password')
+        self.user.save()
+        etag = self.guest_client.get(self.urls[0])['ETag']
+        Client().login(username='Author', password='password')
+        response = self.guest_client.get(
+            self.urls[0], HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_new_comment_invalidates_post_page(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_authorized_user_is_not_served_guest_page(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                response = self.authorized_client.get(url)
+                self.assertNotIn('ETag', response)
+                self.assertContains(response, 'Пользователь: Author')
@@ -1,5 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from ..models import Group, Post
 
@@ -24,12 +30,17 @@ class PaginatorViewsTest(TestCase):
             Post(author=cls.user, text='Тестовый пост', group=cls.group)
             for _ in range(COUNT_POSTS)
         ])
+        # bulk_create не шлёт сигналов: счётчики пересчитываем сами.
+        call_command('recount', stdout=StringIO())
         cls.paginator_urls = [
             '/',
             f'/group/{cls.group.slug}/',
             f'/profile/{cls.user}/'
         ]
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_contains_ten_records(self):
 
         pages = (
@@ -43,3 +54,83 @@ class PaginatorViewsTest(TestCase):
                     self.assertEqual(
                         len(response.context["page_obj"].object_list), count
                     )
+
+    def test_cursor_pages(self):
+        """?cursor= листает ленты по ключу без повторов и пропусков."""
+        for url in self.paginator_urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'cursor': ''})
+                first_page = response.context['page_obj']
+                self.assertEqual(len(first_page), POST_FIRST_PAGE)
+                self.assertFalse(first_page.has_previous())
+                self.assertTrue(first_page.has_next())
+                response = self.client.get(
+                    url, {'cursor': first_page.next_cursor}
+                )
+                second_page = response.context['page_obj']
+                self.assertEqual(len(second_page), POST_SECOND_PAGE)
+                self.assertFalse(second_page.has_next())
+                seen = [post.id for post in first_page]
+                seen += [post.id for post in second_page]
+                self.assertEqual(len(set(seen)), COUNT_POSTS)
+                response = self.client.get(
+                    url, {'cursor': second_page.previous_cursor}
+                )
+                self.assertEqual(
+                    [post.id for post in response.context['page_obj']],
+                    [post.id for post in first_page]
+                )
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get('/', {'cursor': 'broken'})
+        self.assertEqual(
+            len(response.context['page_obj']), POST_FIRST_PAGE
+        )
+
+    def test_count_is_cached_and_invalidated(self):
+        url = f'/profile/{self.user}/'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']]
+        )
+        Post.objects.create(author=self.user, text='Ещё пост')
+        response = self.client.get(url)
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, COUNT_POSTS + 1
+        )
+
+    @override_settings(PAGINATOR_COUNT_LIMIT=POST_FIRST_PAGE)
+    def test_count_is_approximated_above_limit(self):
+        response = self.client.get('/')
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(paginator.count, POST_FIRST_PAGE)
+        self.assertTrue(paginator.count_is_approximate)
+
+    @override_settings(PAGINATOR_COUNT_LIMIT=POST_FIRST_PAGE)
+    def test_pages_past_approximate_count_are_reachable(self):
+        """Оценка сверху не обрезает ленту: дальше листает курсор."""
+        first_page = self.client.get('/').context['page_obj']
+        self.assertTrue(first_page.has_next())
+        response = self.client.get('/', {'cursor': first_page.next_cursor})
+        self.assertEqual(len(response.context['page_obj']), POST_SECOND_PAGE)
+        response = self.client.get('/', {'page': 2})
+        page = response.context['page_obj']
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), POST_SECOND_PAGE)
+        self.assertFalse(page.has_next())
+        self.assertEqual(page.paginator.count, COUNT_POSTS)
+
+    @override_settings(PAGINATOR_COUNT_LIMIT=POST_FIRST_PAGE)
+    def test_profile_count_comes_from_counter(self):
+        """Профиль берёт точное число постов из счётчика автора."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/profile/{self.user}/')
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']]
+        )
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(paginator.count, COUNT_POSTS)
+        self.assertFalse(paginator.count_is_approximate)
+        self.assertContains(response, f'Всего постов: {COUNT_POSTS}')
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import query_budget
+
+from ..models import Comment, Follow, Group, Post
+from ..views import NUMBER_POSTS
+
+User = get_user_model()
+# Запросы сессии и пользователя у авторизованного клиента
+AUTH_QUERIES = 2
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class FeedQueryBudgetTests(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for number in range(NUMBER_POSTS + 1):
+            cls.post = Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+        cls.profile_url = reverse(
+            'posts:profile', kwargs={'username': 'writer'}
+        )
+        cls.budgets = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}): 3,
+            cls.profile_url: 3,
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}): 3,
+        }
+        # Гостю страница группы, профиля и поста стоит ещё один запрос:
+        # поиск областей кэша страницы.
+        cls.guest_budgets = {
+            url: budget + (url != reverse('posts:index'))
+            for url, budget in cls.budgets.items()
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_guest_feed_query_budget(self):
+        for url, budget in self.guest_budgets.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with query_budget(budget):
+                    self.client.get(url)
+
+    def test_authorized_feed_query_budget(self):
+        budgets = dict(self.budgets)
+        budgets[reverse('posts:follow_index')] = 3
+        # +1 запрос на проверку подписки
+        budgets[self.profile_url] += 1
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with query_budget(budget + AUTH_QUERIES):
+                    self.authorized_client.get(url)
+
+    @query_budget(2)
+    def test_budget_as_decorator(self):
+        self.client.get(reverse('posts:index'))
+
+    def test_budget_overrun_fails(self):
+        with self.assertRaises(AssertionError):
+            with query_budget(0):
+                self.client.get(reverse('posts:index'))
+
+    def test_cached_guest_page_query_budget(self):
+        for url, budget in self.guest_budgets.items():
+            with self.subTest(url=url):
+                self.client.get(url)
+                with query_budget(budget - 2):
+                    self.client.get(url)
@@ -0,0 +1,127 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..search import (
+    FTS_TABLE, SEARCH_ORDERING, match_expression, search_posts
+)
+from ..views import NUMBER_POSTS
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.kittens = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='Котята котята и ещё раз котята'
+        )
+        cls.mention = Post.objects.create(
+            author=cls.other, text='Здесь котята упомянуты однажды, а про '
+            'собак, погоду и новости написано куда больше слов'
+        )
+        cls.unrelated = Post.objects.create(
+            author=cls.author, text='Про погоду'
+        )
+
+    def found(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return [post.id for post in response.context['page_obj']]
+
+    def test_match_expression(self):
+        self.assertEqual(match_expression('котята  "OR" -'),
+                         '"котята" "OR"*')
+        self.assertIsNone(match_expression('*-"'))
+
+    def test_ranked_results(self):
+        self.assertEqual(
+            self.found('котята'), [self.kittens.id, self.mention.id]
+        )
+
+    def test_prefix_and_case(self):
+        self.assertEqual(self.found('ПОГОД'), [
+            post.id for post in search_posts('погоду').order_by('rank', 'id')
+        ])
+        self.assertIn(self.unrelated.id, self.found('ПОГОД'))
+
+    def test_filters(self):
+        self.assertEqual(self.found('котята', group='group'),
+                         [self.kittens.id])
+        self.assertEqual(self.found('котята', author='other'),
+                         [self.mention.id])
+
+    def test_query_without_words(self):
+        response = self.client.get(reverse('posts:search'), {'q': '"*'})
+        self.assertIsNone(response.context['page_obj'])
+        self.assertContains(response, 'В запросе нет слов для поиска.')
+        self.assertFalse(search_posts('"*').order_by(*SEARCH_ORDERING))
+
+    def test_index_follows_changes(self):
+        post = Post.objects.create(author=self.author, text='Енот')
+        self.assertEqual(self.found('енот'), [post.id])
+        Post.objects.filter(id=post.id).update(text='Барсук')
+        self.assertEqual(self.found('енот'), [])
+        self.assertEqual(self.found('барсук'), [post.id])
+        post.delete()
+        self.assertEqual(self.found('барсук'), [])
+
+    def test_cursor_pages_keep_query(self):
+        Post.objects.bulk_create([
+            Post(author=self.author, text=f'Выдра {number}')
+            for number in range(NUMBER_POSTS + 2)
+        ])
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'выдра'})
+        first = response.context['page_obj']
+        self.assertEqual(len(first), NUMBER_POSTS)
+        self.assertContains(
+            response, '?q=%D0%B2%D1%8B%D0%B4%D1%80%D0%B0&amp;cursor='
+        )
+        response = self.client.get(
+            url, {'q': 'выдра', 'cursor': first.next_cursor}
+        )
+        second = response.context['page_obj']
+        self.assertEqual(len(second), 2)
+        self.assertFalse({post.id for post in first}
+                         & {post.id for post in second})
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"
+            )
+        self.assertEqual(self.found('котята'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        self.assertIn('Проиндексировано постов: 3', out.getvalue())
+        self.assertEqual(
+            self.found('котята'), [self.kittens.id, self.mention.id]
+        )
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котят'}
+        )
+        self.assertEqual(
+            {post.id for post in response.context['cl'].result_list},
+            {self.kittens.id, self.mention.id}
+        )
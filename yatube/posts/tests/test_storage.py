@@ -0,0 +1,151 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from ..models import MediaFile, Post
+from ..storage import content_storage
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+DIGEST = hashlib.sha256(SMALL_GIF).hexdigest()
+HASHED_NAME = f'posts/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.gif'
+HOUR_AGO = time.time() - 3600 - 60
+
+
+# Файл удаляется после коммита, поэтому тесты идут с настоящими
+# транзакциями.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True)
+class ContentAddressedStorageTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.user, text='Пост',
+            image=SimpleUploadedFile(name, SMALL_GIF)
+        )
+
+    def path(self, name):
+        return os.path.join(TEMP_MEDIA_ROOT, name)
+
+    def refs(self, name):
+        return MediaFile.objects.filter(name=name).values_list(
+            'refs', flat=True
+        ).first()
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.create_post('one.gif')
+        second = self.create_post('two.GIF')
+        self.assertEqual(first.image.name, HASHED_NAME)
+        self.assertEqual(second.image.name, HASHED_NAME)
+        self.assertEqual(os.listdir(os.path.dirname(self.path(HASHED_NAME))),
+                         [os.path.basename(HASHED_NAME)])
+        self.assertEqual(self.refs(HASHED_NAME), 2)
+
+        first.delete()
+        self.assertTrue(os.path.exists(self.path(HASHED_NAME)))
+        self.assertEqual(self.refs(HASHED_NAME), 1)
+        second.delete()
+        self.assertFalse(os.path.exists(self.path(HASHED_NAME)))
+        self.assertIsNone(self.refs(HASHED_NAME))
+
+    def test_replaced_image_is_released(self):
+        post = self.create_post()
+        post.image = SimpleUploadedFile('other.gif', SMALL_GIF + b'\0')
+        post.save()
+        self.assertNotEqual(post.image.name, HASHED_NAME)
+        self.assertFalse(os.path.exists(self.path(HASHED_NAME)))
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def test_release_of_stale_counter_deletes_file(self):
+        post = self.create_post()
+        MediaFile.objects.filter(name=HASHED_NAME).update(refs=0)
+        post.delete()
+        self.assertFalse(os.path.exists(self.path(HASHED_NAME)))
+        self.assertIsNone(self.refs(HASHED_NAME))
+
+    def test_save_of_existing_content_is_not_rewritten(self):
+        name = content_storage.save('posts/a.gif', ContentFile(SMALL_GIF))
+        path = self.path(name)
+        os.utime(path, (HOUR_AGO, HOUR_AGO))
+        inode = os.stat(path).st_ino
+        self.assertEqual(
+            content_storage.save('posts/b.gif', ContentFile(SMALL_GIF)), name
+        )
+        # Файл тот же, но время изменения свежее: сборщик мусора его
+        # не тронет, пока новая ссылка не закоммичена.
+        self.assertEqual(os.stat(path).st_ino, inode)
+        self.assertGreater(os.stat(path).st_mtime, HOUR_AGO + 3600)
+
+    def test_save_rewrites_file_removed_meanwhile(self):
+        name = content_storage.save('posts/a.gif', ContentFile(SMALL_GIF))
+        os.remove(self.path(name))
+        # Сборщик мусора удалил файл между проверкой и обновлением
+        # времени изменения.
+        with mock.patch.object(
+            content_storage, 'exists', side_effect=[True, False]
+        ):
+            self.assertEqual(
+                content_storage.save('posts/b.gif', ContentFile(SMALL_GIF)),
+                name
+            )
+        self.assertTrue(os.path.exists(self.path(name)))
+
+    def test_migrate_media(self):
+        flat = FileSystemStorage(location=TEMP_MEDIA_ROOT)
+        flat.save('posts/old.gif', ContentFile(SMALL_GIF))
+        posts = [
+            Post.objects.create(
+                author=self.user, text='Старый', image='posts/old.gif'
+            )
+            for _ in range(2)
+        ]
+        missing = Post.objects.create(
+            author=self.user, text='Без файла', image='posts/gone.gif'
+        )
+        out = StringIO()
+        call_command('migrate_media', dry_run=True, stdout=out)
+        self.assertIn('Будет перенесено файлов: 3', out.getvalue())
+
+        out = StringIO()
+        call_command(
+            'migrate_media', batch_size=1, stdout=out, stderr=StringIO()
+        )
+        self.assertIn('Перенесено файлов: 2, не найдено: 1', out.getvalue())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertEqual(post.image.name, HASHED_NAME)
+        missing.refresh_from_db()
+        self.assertEqual(missing.image.name, 'posts/gone.gif')
+        self.assertFalse(os.path.exists(self.path('posts/old.gif')))
+        self.assertEqual(self.refs(HASHED_NAME), 2)
+        self.assertIsNone(self.refs('posts/old.gif'))
@@ -0,0 +1,273 @@
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+
+from .. import thumbnails
+from ..models import CacheStat, Post
+from ..thumbnails import cached_thumbnail, generate, variants
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+PLACEHOLDER = 'Изображение обрабатывается'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self):
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(
+                    'small.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            },
+        )
+        return Post.objects.get(text='Пост с картинкой')
+
+    def test_pages_never_resize(self):
+        """Пока миниатюры нет, страницы показывают заглушку."""
+        with mock.patch.object(generate, 'delay') as delay:
+            post = self.create_post()
+        delay.assert_called_once_with(post.id)
+        with mock.patch('sorl.thumbnail.base.ThumbnailBackend.'
+                        '_create_thumbnail') as create:
+            for url in (
+                reverse('posts:index'),
+                reverse('posts:post_detail', args=[post.id]),
+            ):
+                with self.subTest(url=url):
+                    self.assertContains(self.client.get(url), PLACEHOLDER)
+        create.assert_not_called()
+        self.assertIsNone(cached_thumbnail(post.image, 'feed'))
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_generated_thumbnail_replaces_placeholder(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        post = self.create_post()
+        thumbnail = cached_thumbnail(post.image, 'feed')
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(url)
+        self.assertNotContains(response, PLACEHOLDER)
+        self.assertContains(response, thumbnail.url)
+
+    def test_generate_refreshes_cached_pages(self):
+        with mock.patch.object(generate, 'delay'):
+            post = self.create_post()
+        url = reverse('posts:post_detail', args=[post.id])
+        self.assertContains(self.client.get(url), PLACEHOLDER)
+        generate(post.id)
+        self.assertNotContains(self.client.get(url), PLACEHOLDER)
+
+    def test_thumbnail_from_another_process_replaces_miss(self):
+        with mock.patch.object(generate, 'delay'):
+            post = self.create_post()
+        self.assertIsNone(thumbnails.post_thumbnail(post))
+        # Другой процесс пишет миниатюры в БД и в свой кэш, не в наш.
+        with mock.patch.object(KVStore, 'cache', DummyCache('other', {})):
+            generate(post.id)
+        post = Post.objects.get(id=post.id)
+        self.assertIsNone(thumbnails.post_thumbnail(post))
+        later = time.time() + thumbnails.MISS_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            post = Post.objects.get(id=post.id)
+            self.assertIsNotNone(thumbnails.post_thumbnail(post))
+
+    def test_edit_without_new_image_does_not_schedule(self):
+        with mock.patch.object(generate, 'delay'):
+            post = self.create_post()
+        with mock.patch.object(generate, 'delay') as delay:
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=[post.id]),
+                data={'text': 'Новый текст'},
+            )
+        delay.assert_not_called()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True)
+class ThumbnailPrefetchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        for number in range(3):
+            post = Post.objects.create(
+                author=cls.user, text=f'Пост {number}',
+                image=SimpleUploadedFile(
+                    f'small{number}.gif', SMALL_GIF, content_type='image/gif'
+                )
+            )
+            generate(post.id)
+        Post.objects.create(author=cls.user, text='Без картинки')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnails.reset_stats()
+
+    def test_prefetch_is_one_query_per_page(self):
+        posts = list(Post.objects.all())
+        with CaptureQueriesContext(connection) as queries:
+            thumbnails.prefetch(posts)
+        self.assertEqual(len(queries), 1)
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
+            found = [thumbnails.post_thumbnail(post) for post in posts]
+        self.assertEqual(
+            [thumbnail is not None for thumbnail in found],
+            [bool(post.image) for post in posts]
+        )
+        self.assertEqual(found[-1].url, cached_thumbnail(
+            posts[-1].image, 'feed'
+        ).url)
+
+    def test_feed_page_resolves_thumbnails_together(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        kvstore_queries = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        self.assertNotContains(response, PLACEHOLDER)
+
+    def test_stats(self):
+        posts = list(Post.objects.all())
+        thumbnails.prefetch(posts)
+        thumbnails.prefetch(posts)
+        # Одинаковые картинки лежат в одном файле и делят миниатюры.
+        images = {post.image.name for post in posts if post.image}
+        keys = len(images) * len(thumbnails.variants('feed'))
+        self.assertEqual(thumbnails.read_stats(), (keys, keys))
+        out = StringIO()
+        call_command('thumbnail_stats', reset=True, stdout=out)
+        self.assertIn('доля попаданий: 50.0%', out.getvalue())
+        self.assertEqual(thumbnails.read_stats(), (0, 0))
+
+    def test_stats_are_shared_between_processes(self):
+        posts = list(Post.objects.all())
+        with mock.patch.object(thumbnails, 'STATS_FLUSH_EVERY', 1):
+            thumbnails.prefetch(posts)
+        # Команда запускается отдельным процессом со своим кэшем.
+        cache.clear()
+        self.assertEqual(CacheStat.objects.count(), 1)
+        out = StringIO()
+        call_command('thumbnail_stats', stdout=out)
+        self.assertIn('доля попаданий: 0.0%', out.getvalue())
+        self.assertNotIn('промахов: 0', out.getvalue())
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_THUMBNAIL_WIDTHS=(320, 640),
+    POST_THUMBNAIL_FORMATS=('JPEG',),
+)
+class ResponsiveImageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user, text='Пост',
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            )
+        )
+
+    def test_variants(self):
+        self.assertEqual(variants('feed'), {
+            (320, 'JPEG'): ('320x113', {
+                'crop': 'center', 'upscale': True, 'format': 'JPEG'
+            }),
+            (640, 'JPEG'): ('640x226', {
+                'crop': 'center', 'upscale': True, 'format': 'JPEG'
+            }),
+            (960, 'JPEG'): ('960x339', {
+                'crop': 'center', 'upscale': True, 'format': 'JPEG'
+            }),
+        })
+
+    def test_srcset(self):
+        generate(self.post.id)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        )
+        image = thumbnails.post_image(self.post)
+        self.assertEqual(image.jpeg_srcset.count('w, '), 2)
+        self.assertContains(response, f'srcset="{image.jpeg_srcset}"')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, 'image/webp')
+
+    @override_settings(POST_THUMBNAIL_FORMATS=('JPEG', 'WEBP'))
+    def test_webp_variants(self):
+        if 'WEBP' not in thumbnails.formats():
+            self.skipTest('Pillow собран без WebP')
+        generate(self.post.id)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        )
+        self.assertContains(response, 'type="image/webp"')
+        self.assertIn(
+            '.webp 960w', thumbnails.post_image(self.post).webp_srcset
+        )
+
+    def test_backfill_command(self):
+        self.assertIsNone(thumbnails.post_image(self.post))
+        out = StringIO()
+        call_command('backfill_thumbnails', workers=0, stdout=out)
+        self.assertIn('Обработано постов: 1', out.getvalue())
+        del self.post._thumbnails
+        self.assertEqual(
+            len(thumbnails.post_image(self.post).ready), 3
+        )
@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Post, PullAuthor, TimelineEntry
+from ..timeline import trim
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def feed_ids(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.id for post in response.context['page_obj']]
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        old_post = Post.objects.create(author=self.author, text='Старый')
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.feed_ids(), [old_post.id])
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertEqual(self.feed_ids(), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user))
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_timeline_is_capped(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        self.assertEqual(
+            set(self.feed_ids()), {posts[1].id, posts[2].id}
+        )
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_fan_out_trims_only_full_timelines(self):
+        readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(5)
+        ]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.author)
+        Post.objects.create(author=self.author, text='Первый')
+        # Ленты не переполнены: один запрос с группировкой, без
+        # выборки лишних записей по каждому читателю.
+        with CaptureQueriesContext(connection) as queries:
+            trim([reader.id for reader in readers])
+        self.assertEqual(len(queries), 1)
+        for number in range(2):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        for reader in readers:
+            self.assertEqual(
+                TimelineEntry.objects.filter(user=reader).count(), 2
+            )
+
+    def test_rebuild_command_repairs_timeline(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    @override_settings(TIMELINE_PULL_THRESHOLD=1)
+    def test_big_author_is_pulled_at_read_time(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(PullAuthor.objects.filter(author=self.author))
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        self.assertEqual(self.feed_ids(), [post.id])
+        # Чтение ленты ничего не пишет.
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+
+    @override_settings(TIMELINE_PULL_THRESHOLD=1)
+    def test_new_follow_of_pulled_author_shows_old_posts(self):
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.user, author=other)
+        old_post = Post.objects.create(author=self.author, text='Старый')
+        self.feed_ids()
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertIn(old_post.id, self.feed_ids())
+
+    @override_settings(TIMELINE_PULL_THRESHOLD=5, TIMELINE_PUSH_RATIO=0.8)
+    def test_author_returns_to_push_well_below_threshold(self):
+        others = [
+            User.objects.create_user(username=f'other{number}')
+            for number in range(4)
+        ]
+        Follow.objects.create(user=self.user, author=self.author)
+        for other in others:
+            Follow.objects.create(user=other, author=self.author)
+        self.assertTrue(PullAuthor.objects.filter(author=self.author))
+        post = Post.objects.create(author=self.author, text='Пост')
+        # У самого порога автор остаётся на pull.
+        Follow.objects.filter(user=others[0]).delete()
+        self.assertTrue(PullAuthor.objects.filter(author=self.author))
+        Follow.objects.create(user=others[0], author=self.author)
+        Follow.objects.filter(user=others[0]).delete()
+        self.assertTrue(PullAuthor.objects.filter(author=self.author))
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        Follow.objects.filter(user=others[1]).delete()
+        self.assertFalse(PullAuthor.objects.filter(author=self.author))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        out = StringIO()
+        call_command('timeline_strategy', stdout=out)
+        self.assertIn('writer: push', out.getvalue())
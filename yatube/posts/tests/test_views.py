@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -110,17 +113,56 @@ class PostPagesTests(TestCase):
                     self.assertIsInstance(form_field, expected)
 
     def test_cache_index(self):
+        """Лента кэшируется до изменения поста, новый пост виден сразу."""
+        cache.clear()
         response = self.authorized_client.get(reverse('posts:index'))
         resp_1 = response.content
-        self.post2 = Post.objects.create(
+        Post.objects.filter(id=self.post.id).update(text='Без сигнала')
+        response_2 = self.authorized_client.get(reverse('posts:index'))
+        resp_2 = response_2.content
+        self.assertTrue(resp_1 == resp_2)
+        Post.objects.create(
             text='Тестовый пост 2',
             author=self.user,
             group=self.group
         )
-        response_2 = self.authorized_client.get(reverse('posts:index'))
-        resp_2 = response_2.content
-        self.assertTrue(resp_1 == resp_2)
-        cache.clear()
         response_3 = self.authorized_client.get(reverse('posts:index'))
         resp_3 = response_3.content
         self.assertTrue(resp_2 != resp_3)
+        self.assertContains(response_3, 'Тестовый пост 2')
+
+    def test_cache_is_per_page(self):
+        """Фрагмент ленты кэшируется отдельно для каждой страницы."""
+        cache.clear()
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост {number}', group=self.group)
+            for number in range(10)
+        ])
+        call_command('recount', stdout=StringIO())
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url, {'page': 1})
+                second = self.authorized_client.get(url, {'page': 2})
+                self.assertNotContains(second, 'Пост 9')
+                self.assertContains(first, 'Пост 9')
+
+    def test_post_edit_invalidates_group_and_profile(self):
+        cache.clear()
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        post = Post.objects.get(id=self.post.id)
+        post.text = 'Отредактированный пост'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Отредактированный пост')
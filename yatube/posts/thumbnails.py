@@ -0,0 +1,297 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Размеры описаны в settings.POST_THUMBNAILS. После сохранения картинки
+view ставит generate() в фоновую очередь, а шаблоны берут миниатюру
+только из key-value хранилища sorl: пока её там нет, показывается
+заглушка, и ни один просмотр страницы не ресайзит картинку сам.
+
+Каждая миниатюра готовится в нескольких ширинах и форматах
+(POST_THUMBNAIL_WIDTHS, POST_THUMBNAIL_FORMATS) для srcset.
+Миниатюры страницы ленты ищутся разом: prefetch() берёт их ключи
+из кэша одним get_many и добирает промахи одним запросом к таблице
+key-value хранилища, а счётчики попаданий копятся в таблице CacheStat
+для команды thumbnail_stats.
+"""
+import functools
+import logging
+import threading
+
+from django.conf import settings
+from django.db.models import F
+from PIL import features
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from core import background
+from core.jobs import job
+
+from . import caching
+from .models import CacheStat, Post
+
+logger = logging.getLogger(__name__)
+
+BASE_FORMAT = 'JPEG'
+STATS_HITS_KEY = 'thumbnails:kvstore:hits'
+STATS_MISSES_KEY = 'thumbnails:kvstore:misses'
+# Счётчики копятся в процессе и раз в столько поисков сбрасываются
+# в базу фоновой задачей, не записью из запроса на чтение.
+STATS_FLUSH_EVERY = 1000
+# Сколько секунд помнить, что миниатюры нет. Её создаёт фоновая
+# задача, часто в другом процессе, и до его локального кэша запись
+# не доходит: дольше заглушка висела бы после готовой миниатюры.
+MISS_TIMEOUT = 5
+
+
+def geometries():
+    return settings.POST_THUMBNAILS
+
+
+@functools.lru_cache(maxsize=None)
+def _can_encode(image_format):
+    if image_format == 'WEBP' and not features.check('webp'):
+        logger.warning('Pillow собран без WebP, варианты не создаются')
+        return False
+    return True
+
+
+def formats():
+    """Форматы вариантов, которые умеет кодировать установленный Pillow."""
+    result = [BASE_FORMAT]
+    for image_format in settings.POST_THUMBNAIL_FORMATS:
+        if image_format not in result and _can_encode(image_format):
+            result.append(image_format)
+    return result
+
+
+def variants(name):
+    """Варианты миниатюры name: (ширина, формат) -> (геометрия, опции).
+
+    Ширины из POST_THUMBNAIL_WIDTHS не больше ширины самой миниатюры,
+    высота считается по её пропорциям.
+    """
+    geometry, options = geometries()[name]
+    width, height = (int(side) for side in geometry.split('x'))
+    widths = {w for w in settings.POST_THUMBNAIL_WIDTHS if w < width}
+    result = {}
+    for variant_width in sorted(widths | {width}):
+        variant_height = round(height * variant_width / width)
+        for image_format in formats():
+            result[variant_width, image_format] = (
+                f'{variant_width}x{variant_height}',
+                {**options, 'format': image_format},
+            )
+    return result
+
+
+def base_variant(name):
+    width = int(geometries()[name][0].split('x')[0])
+    return width, BASE_FORMAT
+
+
+class ResponsiveImage:
+    """Готовые варианты миниатюры для <picture> и srcset."""
+
+    def __init__(self, name, ready):
+        self.ready = ready
+        self.src = ready[base_variant(name)]
+        self.width = self.src.width
+        self.height = self.src.height
+
+    def srcset(self, image_format):
+        return ', '.join(
+            f'{image.url} {width}w'
+            for (width, variant_format), image in sorted(self.ready.items())
+            if variant_format == image_format
+        )
+
+    @property
+    def jpeg_srcset(self):
+        return self.srcset(BASE_FORMAT)
+
+    @property
+    def webp_srcset(self):
+        return self.srcset('WEBP')
+
+
+class CachedThumbnailBackend(ThumbnailBackend):
+    """Ищет готовую миниатюру, никогда не создавая её."""
+
+    def thumbnail_file(self, file_, geometry_string, options):
+        # Опции дополняются так же, как в ThumbnailBackend.get_thumbnail,
+        # иначе имя файла миниатюры не совпадёт с созданным.
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        thumbnail = self.thumbnail_file(file_, geometry_string, options)
+        key = add_prefix(thumbnail.key)
+        value = _load([key])[key]
+        if value is None or value == EMPTY_VALUE:
+            return None
+        return deserialize_image_file(value)
+
+
+backend = CachedThumbnailBackend()
+
+
+def cached_thumbnail(image, name):
+    """Готовая миниатюра картинки или None, если её ещё нет."""
+    if not image:
+        return None
+    geometry, options = geometries()[name]
+    return backend.get_cached_thumbnail(image, geometry, **options)
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits, misses):
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+            if self.hits + self.misses < STATS_FLUSH_EVERY:
+                return
+        background.submit(self.flush)
+
+    def flush(self):
+        with self.lock:
+            pending = {
+                STATS_HITS_KEY: self.hits, STATS_MISSES_KEY: self.misses
+            }
+            self.hits = self.misses = 0
+        for name, value in pending.items():
+            if not value:
+                continue
+            CacheStat.objects.get_or_create(name=name)
+            CacheStat.objects.filter(name=name).update(
+                value=F('value') + value
+            )
+
+
+stats = _Stats()
+
+
+def read_stats():
+    """Попадания и промахи кэша key-value хранилища sorl."""
+    stats.flush()
+    values = dict(CacheStat.objects.filter(
+        name__in=[STATS_HITS_KEY, STATS_MISSES_KEY]
+    ).values_list('name', 'value'))
+    return values.get(STATS_HITS_KEY, 0), values.get(STATS_MISSES_KEY, 0)
+
+
+def reset_stats():
+    stats.flush()
+    CacheStat.objects.filter(
+        name__in=[STATS_HITS_KEY, STATS_MISSES_KEY]
+    ).delete()
+
+
+def _load(keys):
+    """Значения ключей хранилища sorl: кэш одним get_many, затем БД."""
+    kv_cache = default.kvstore.cache
+    found = kv_cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        stored = dict(
+            KVStore.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        kv_cache.set_many(stored, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        # Отсутствие ключа запоминаем ненадолго, в отличие от sorl.
+        absent = {key: EMPTY_VALUE for key in missing if key not in stored}
+        kv_cache.set_many(absent, MISS_TIMEOUT)
+        found.update(stored)
+        found.update(absent)
+    stats.record(len(keys) - len(missing), len(missing))
+    return found
+
+
+def prefetch(posts, name='feed'):
+    """Кладёт в посты готовые варианты миниатюры name за один проход.
+
+    Теги post_image и post_thumbnail берут их из поста и не обращаются
+    к хранилищу по отдельности.
+    """
+    name_variants = variants(name)
+    wanted = {}
+    for post in posts:
+        if not hasattr(post, '_thumbnails'):
+            post._thumbnails = {}
+        post._thumbnails[name] = {}
+        if not post.image:
+            continue
+        for variant, (geometry, options) in name_variants.items():
+            thumbnail = backend.thumbnail_file(
+                post.image, geometry, dict(options)
+            )
+            wanted.setdefault(add_prefix(thumbnail.key), []).append(
+                (post, variant)
+            )
+    if not wanted:
+        return
+    for key, value in _load(list(wanted)).items():
+        if value is None or value == EMPTY_VALUE:
+            continue
+        thumbnail = deserialize_image_file(value)
+        for post, variant in wanted[key]:
+            post._thumbnails[name][variant] = thumbnail
+
+
+def _ready(post, name):
+    if name not in getattr(post, '_thumbnails', {}):
+        prefetch([post], name)
+    return post._thumbnails[name]
+
+
+def post_thumbnail(post, name='feed'):
+    """Основная миниатюра поста из prefetch() или отдельным поиском."""
+    return _ready(post, name).get(base_variant(name))
+
+
+def post_image(post, name='feed'):
+    """Все готовые варианты миниатюры или None, пока нет основной."""
+    ready = _ready(post, name)
+    if base_variant(name) not in ready:
+        return None
+    return ResponsiveImage(name, ready)
+
+
+@job(queue='thumbnails', retries=2)
+def generate(post_id):
+    """Создаёт все миниатюры картинки поста во всех вариантах."""
+    post = Post.objects.filter(id=post_id).only(
+        'id', 'author_id', 'group_id', 'image'
+    ).first()
+    if post is None or not post.image:
+        return
+    for name in geometries():
+        for geometry, options in variants(name).values():
+            get_thumbnail(post.image, geometry, **options)
+    # Фрагменты и страницы с заглушкой собираются заново.
+    caching.bump_versions(caching.post_scopes(post))
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр поста в фоновую очередь."""
+    if post.image:
+        generate.delay(post.id)
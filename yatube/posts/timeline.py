@@ -0,0 +1,210 @@
+"""Материализованная лента подписок (гибрид fan-out on write и on read).
+
+Посты обычных авторов раскладываются по лентам подписчиков пачками
+в фоне, поэтому follow_index читает готовый список из TimelineEntry.
+Авторы с числом подписчиков от TIMELINE_PULL_THRESHOLD помечаются
+PullAuthor: их посты не раскладываются при публикации, а подмешиваются
+к ленте читателя в запросе, без записи в TimelineEntry. Обратно на push
+автор переходит с запасом, ниже TIMELINE_PUSH_RATIO от порога.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from core.jobs import job
+
+from . import caching
+from .models import Follow, Post, PullAuthor, TimelineEntry, UserCounter
+
+PUSH = 'push'
+PULL = 'pull'
+# Порядок ленты подписок по аннотациям feed(): они указывают на колонки
+# TimelineEntry, и сортировка идёт по её индексу.
+FEED_ORDERING = ('-feed_date', '-feed_post')
+
+
+def timeline_length():
+    return settings.TIMELINE_MAX_LENGTH
+
+
+def is_pulled(author_id):
+    return PullAuthor.objects.filter(author_id=author_id).exists()
+
+
+def follower_count(author_id):
+    return UserCounter.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+def strategy(author_id, followers=None, pulled=None):
+    """Путь, которым посты автора попадают в ленты: push или pull.
+
+    Pull-автор возвращается на push, только когда подписчиков меньше
+    TIMELINE_PUSH_RATIO от порога. Иначе автор у самого порога менял бы
+    путь на каждой подписке и отписке, и ленты его подписчиков всякий
+    раз дозаполнялись бы заново.
+    """
+    if followers is None:
+        followers = follower_count(author_id)
+    if pulled is None:
+        pulled = is_pulled(author_id)
+    threshold = settings.TIMELINE_PULL_THRESHOLD
+    if pulled:
+        threshold *= settings.TIMELINE_PUSH_RATIO
+    if followers >= threshold:
+        return PULL
+    return PUSH
+
+
+def trim(user_ids):
+    """Обрезает ленты пользователей до TIMELINE_MAX_LENGTH записей.
+
+    Переполненные ленты находятся одним запросом с группировкой, и
+    лишние записи ищутся только в них.
+    """
+    limit = timeline_length()
+    overflowing = TimelineEntry.objects.filter(
+        user_id__in=user_ids
+    ).order_by().values('user_id').annotate(
+        entries=Count('id')
+    ).filter(entries__gt=limit).values_list('user_id', flat=True)
+    for user_id in overflowing:
+        stale = list(
+            TimelineEntry.objects.filter(user_id=user_id).order_by(
+                '-pub_date', '-post_id'
+            ).values_list('id', flat=True)[limit:]
+        )
+        if stale:
+            TimelineEntry.objects.filter(id__in=stale).delete()
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Ставит раскладку поста по лентам подписчиков в фон."""
+    if is_pulled(post.author_id):
+        caching.invalidate_follow_counts()
+        return
+    fan_out_batches.delay(post.id)
+
+
+@job(queue='timelines', retries=2)
+def fan_out_batches(post_id):
+    """Раскладывает пост по лентам пачками по TIMELINE_FANOUT_BATCH_SIZE."""
+    post = Post.objects.filter(id=post_id).only(
+        'id', 'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        return
+    batch_size = settings.TIMELINE_FANOUT_BATCH_SIZE
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).order_by('user_id').values_list('user_id', flat=True)
+    last_id = 0
+    while True:
+        batch = list(follower_ids.filter(user_id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            _insert([
+                TimelineEntry(
+                    user_id=user_id, post_id=post.id, pub_date=post.pub_date
+                )
+                for user_id in batch
+            ])
+            trim(batch)
+        caching.invalidate_follow_counts(batch)
+        last_id = batch[-1]
+
+
+def backfill(user_id, author_id):
+    """Подкладывает в ленту последние посты нового автора подписки."""
+    if is_pulled(author_id):
+        # Посты pull-автора подмешиваются при чтении ленты.
+        return
+    recent = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:timeline_length()]
+    with transaction.atomic():
+        _insert([
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in recent
+        ])
+        trim([user_id])
+
+
+def remove(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_id):
+    """Собирает ленту пользователя заново из его push-подписок."""
+    recent = Post.objects.filter(
+        author__following__user_id=user_id,
+        author__pull_feed__isnull=True,
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date'
+    )[:timeline_length()]
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        _insert([
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in recent
+        ])
+    caching.invalidate_follow_counts([user_id])
+
+
+def update_strategy(author_id, followers=None):
+    """Переводит автора на путь, соответствующий числу подписчиков.
+
+    Возвращает актуальный путь. При возврате с pull на push ленты
+    подписчиков дозаполняются в фоне.
+    """
+    pulled = is_pulled(author_id)
+    target = strategy(author_id, followers, pulled)
+    if target == PULL and not pulled:
+        PullAuthor.objects.get_or_create(author_id=author_id)
+    elif target == PUSH and pulled:
+        PullAuthor.objects.filter(author_id=author_id).delete()
+        backfill_followers.delay(author_id)
+    return target
+
+
+@job(queue='timelines', retries=2)
+def backfill_followers(author_id):
+    follower_ids = Follow.objects.filter(
+        author_id=author_id
+    ).order_by('user_id').values_list('user_id', flat=True)
+    for user_id in follower_ids.iterator():
+        backfill(user_id, author_id)
+    caching.invalidate_follow_counts()
+
+
+def feed(user):
+    """Посты ленты подписок, сортировать по FEED_ORDERING.
+
+    Без pull-авторов в подписках лента — диапазон по индексу
+    (user, pub_date, post) в TimelineEntry. Иначе к ней через OR
+    подмешиваются посты pull-авторов; сортировка тогда идёт по
+    колонкам поста.
+    """
+    pulled_ids = list(
+        Follow.objects.filter(
+            user=user, author__pull_feed__isnull=False
+        ).values_list('author_id', flat=True)
+    )
+    if not pulled_ids:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post_id'),
+        )
+    pushed = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(id__in=pushed) | Q(author_id__in=pulled_ids)
+    ).annotate(feed_date=F('pub_date'), feed_post=F('id'))
@@ -1,44 +1,77 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.http import urlencode
 
-from .forms import CommentForm, PostForm
+from . import caching, counters, events, export, search, thumbnails
+from .decorators import anonymous_page_cache
+from .forms import CommentForm, PostForm, SearchForm
 from .models import Comment, Group, Post, Follow, User
+from .paginators import COMMENT_ORDERING, CursorPaginator, paginate
+from .timeline import FEED_ORDERING, feed
 
 
 NUMBER_POSTS = 10
+NUMBER_COMMENTS = 50
 
 
+def comments_page(request, post_id):
+    """Очередная пачка комментариев поста по курсору ?comments=."""
+    comments = Comment.objects.select_related('author').filter(
+        post_id=post_id
+    )
+    return CursorPaginator(
+        comments, NUMBER_COMMENTS, COMMENT_ORDERING
+    ).get_page(request.GET.get(caching.COMMENTS_CURSOR_PARAM))
+
+
+@anonymous_page_cache(caching.index_page_scopes)
 def index(request):
-    post_list = Post.objects.select_related('group').all()
-    paginator = Paginator(post_list, NUMBER_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = paginate(
+        request, post_list, NUMBER_POSTS,
+        count_key=caching.count_key(caching.INDEX)
+    )
     context = {
         'page_obj': page_obj,
+        **caching.fragment_context(request, page_obj, caching.INDEX),
     }
     return render(request, 'posts/index.html', context)
 
 
+@anonymous_page_cache(caching.group_page_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, NUMBER_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = group.posts.select_related('author', 'group')
+    page_obj = paginate(
+        request, post_list, NUMBER_POSTS, known_count=group.posts_count
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        **caching.fragment_context(
+            request, page_obj, caching.group_scope(group.id)
+        ),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@anonymous_page_cache(caching.profile_page_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, NUMBER_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
+    posts = author.posts.select_related('author', 'group')
+    page_obj = paginate(
+        request, posts, NUMBER_POSTS,
+        known_count=counters.user_counter(author, 'posts_count')
+    )
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author
     ).exists()
@@ -46,31 +79,73 @@ def profile(request, username):
         'page_obj': page_obj,
         'author': author,
         'following': following,
+        **caching.fragment_context(
+            request, page_obj, caching.author_scope(author.id)
+        ),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@anonymous_page_cache(caching.post_page_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        id=post_id
+    )
     form = CommentForm()
-    comments = Comment.objects.select_related(
-        'author').filter(
-            post__id=post_id)
     context = {
         'post': post,
-        'comments': comments,
+        'comments': comments_page(request, post_id),
         'form': form
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@anonymous_page_cache(caching.post_page_scopes)
+def post_comments(request, post_id):
+    """HTML-фрагмент со следующей пачкой комментариев для «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(request, post_id),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+def post_search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        posts = search.search_posts(form.cleaned_data['q'])
+        if form.cleaned_data['group'] is not None:
+            posts = posts.filter(group=form.cleaned_data['group'])
+        if form.cleaned_data['author']:
+            posts = posts.filter(
+                author__username=form.cleaned_data['author']
+            )
+        page_obj = CursorPaginator(
+            posts.select_related('author', 'group'), NUMBER_POSTS,
+            search.SEARCH_ORDERING
+        ).get_page(request.GET.get(caching.CURSOR_PARAM))
+    query = request.GET.copy()
+    query.pop(caching.CURSOR_PARAM, None)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'query_prefix': query.urlencode() + '&' if query else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        form.save()
+        with transaction.atomic():
+            form.save()
+            thumbnails.schedule(post)
         return redirect('posts:profile', username=request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -87,7 +162,10 @@ def post_edit(request, post_id):
     if request.user != post.author:
         return redirect('posts:post_detail', post_id)
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            form.save()
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id)
     return render(
         request,
@@ -108,20 +186,22 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
         return redirect('posts:post_detail', post_id=post_id)
     return render(request, "posts/post_detail.html", context={"form": form})
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, NUMBER_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = feed(request.user).select_related('author', 'group')
+    page_obj = paginate(
+        request, post_list, NUMBER_POSTS, FEED_ORDERING,
+        count_key=caching.follow_count_key(request.user.id)
+    )
     context = {
         'page_obj': page_obj,
-        'paginator': paginator
+        'paginator': page_obj.paginator
     }
     return render(request, 'posts/follow.html', context)
 
@@ -143,3 +223,80 @@ def profile_unfollow(request, username):
     )
     profile_follow.delete()
     return redirect('posts:profile', username=username)
+
+
+@staff_member_required
+def export_table(request, table):
+    """Потоковая выгрузка таблицы; водяной знак — в X-Export-Watermark."""
+    exported = export.TABLES.get(table)
+    file_format = request.GET.get('format', 'jsonl')
+    if exported is None or file_format not in export.FORMATS:
+        raise Http404
+    try:
+        since_id, since_date = exported.parse_since(
+            request.GET.get('since'), request.GET.get('since_id')
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    compress = request.GET.get('gzip') == '1'
+    until = exported.watermark()
+    response = StreamingHttpResponse(
+        export.export(
+            exported, file_format, compress, since_id, until,
+            since_date=since_date
+        ),
+        content_type=(
+            'application/gzip' if compress else export.FORMATS[file_format]
+        ),
+    )
+    filename = f'{table}-{timezone.now():%Y%m%d}.{file_format}'
+    if compress:
+        filename += '.gz'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Export-Watermark'] = urlencode(
+        exported.format_watermark(until)
+    )
+    return response
+
+
+def event_stream(request):
+    """Поток SSE о новых постах лент и комментариях к постам.
+
+    Области задаются параметрами group, author и post (можно по
+    нескольку); без них — лента всего сайта.
+    """
+    scopes = set()
+    for slug in request.GET.getlist('group'):
+        group = get_object_or_404(Group.objects.only('id'), slug=slug)
+        scopes.add(caching.group_scope(group.id))
+    for username in request.GET.getlist('author'):
+        author = get_object_or_404(
+            User.objects.only('id'), username=username
+        )
+        scopes.add(caching.author_scope(author.id))
+    try:
+        scopes.update(
+            caching.post_scope(int(post_id))
+            for post_id in request.GET.getlist('post')
+        )
+        last_id = request.META.get('HTTP_LAST_EVENT_ID')
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return HttpResponseBadRequest('Неверный номер')
+    lines = events.streams.open(
+        events.stream(scopes or {caching.INDEX}, last_id)
+    )
+    if lines is None:
+        response = HttpResponse(
+            events.retry_line(), content_type='text/event-stream',
+            status=503
+        )
+        response['Retry-After'] = settings.EVENTS_RETRY
+        return response
+    response = StreamingHttpResponse(
+        lines, content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Не копить поток в буфере nginx.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
@@ -80,6 +81,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+# Потоки, в которых ASGI-приложение выполняет запросы к Django
+ASGI_THREADS = 16
+# Отдельные потоки для чтения потоковых ответов; не меньше
+# EVENTS_MAX_STREAMS, иначе потоки событий ждут друг друга
+ASGI_STREAM_THREADS = 8
 
 
 # Database
@@ -91,6 +98,9 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# Прагмы, которые выполняются при открытии каждого соединения SQLite;
+# набор для боевого сервера — в settings_production
+SQLITE_PRAGMAS = {}
 
 
 # Password validation
@@ -146,3 +156,85 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Максимальная длина материализованной ленты подписок
+TIMELINE_MAX_LENGTH = 1000
+# Авторы с таким числом подписчиков читаются в ленту при запросе (pull)
+TIMELINE_PULL_THRESHOLD = 10000
+# Pull-автор возвращается на push, когда подписчиков меньше этой доли
+# порога: у самого порога путь не переключается туда и обратно
+TIMELINE_PUSH_RATIO = 0.8
+# Сколько лент подписчиков заполняется за одну транзакцию
+TIMELINE_FANOUT_BATCH_SIZE = 1000
+
+# Фоновые задачи: размер пула и синхронный режим для тестов
+BACKGROUND_TASKS_WORKERS = 2
+BACKGROUND_TASKS_EAGER = False
+# Задачи @job пишутся в таблицу Job и выполняются run_worker,
+# а не пулом потоков процесса, принявшего запрос
+BACKGROUND_TASKS_DURABLE = False
+# Очереди run_worker и сколько задач каждой выполняется одновременно
+JOB_QUEUES = {
+    'default': 2,
+    'thumbnails': 2,
+    'timelines': 1,
+}
+# Периодические задачи: путь к функции с @job -> интервал в секундах
+JOB_SCHEDULE = {
+    'posts.counters.repair': 24 * 60 * 60,
+    'core.jobs.prune_finished': 60 * 60,
+    'posts.events.prune': 60 * 60,
+}
+# Запуск дольше этого считается брошенным упавшим воркером
+JOB_LOCK_TIMEOUT = 30 * 60
+# Пауза воркера, когда готовых задач нет
+JOB_POLL_INTERVAL = 1
+# Сколько секунд хранить выполненные задачи
+JOB_KEEP_FINISHED = 7 * 24 * 60 * 60
+
+# Счётчики постов в пагинаторе: время жизни в кэше и порог,
+# после которого показывается «более N» вместо точного числа
+PAGINATOR_COUNT_TIMEOUT = 60 * 60
+PAGINATOR_COUNT_LIMIT = 10000
+
+# Фрагменты лент в кэше: сбрасываются версией области при изменении
+# поста, время жизни лишь ограничивает занятую память
+FEED_CACHE_TIMEOUT = 60 * 60
+# Время жизни версий областей. Кэш в памяти процесса не видит сдвигов
+# версий из других процессов, поэтому версия живёт недолго; с общим
+# кэшем можно None (см. проверку posts.E001)
+FEED_VERSION_TIMEOUT = 20
+
+# Страницы лент и постов для анонимных посетителей: сбрасываются
+# версиями областей, время жизни лишь ограничивает занятую память
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Миниатюры картинок постов: имя -> (геометрия, опции sorl).
+# Генерируются в фоне после загрузки, страницы их только читают
+POST_THUMBNAILS = {
+    'feed': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Ширины адаптивных вариантов миниатюр и форматы, в которых они
+# готовятся: основной JPEG и WebP для браузеров, которые его понимают
+POST_THUMBNAIL_WIDTHS = (320, 640)
+POST_THUMBNAIL_FORMATS = ('JPEG', 'WEBP')
+
+# Приём картинок постов: предел размера файла и числа пикселей
+# исходника, длинная сторона после уменьшения и качество перекодирования
+POST_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 2048
+POST_IMAGE_QUALITY = 85
+
+# Поток событий (SSE): как часто процесс читает журнал, сколько
+# последних событий держит в памяти, пауза между пингами, время жизни
+# соединения, пауза переподключения клиента и срок хранения журнала
+EVENTS_POLL_INTERVAL = 1
+EVENTS_BUFFER_SIZE = 1000
+EVENTS_HEARTBEAT = 15
+EVENTS_STREAM_DURATION = 5 * 60
+EVENTS_RETRY = 3
+EVENTS_KEEP = 24 * 60 * 60
+# Открытых потоков на процесс; каждый держит поток сервера, лишние
+# клиенты получают 503
+EVENTS_MAX_STREAMS = 8
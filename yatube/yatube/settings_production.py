@@ -0,0 +1,53 @@
+"""
+Настройки боевого сервера: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+
+Основа — yatube.settings; здесь только отличия: отладка выключена,
+секреты и хосты берутся из окружения, кэш общий для всех процессов,
+SQLite работает в режиме WAL с постоянными соединениями.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import ALLOWED_HOSTS, BASE_DIR, DATABASES, SECRET_KEY
+
+DEBUG = False
+TEMPLATE_DEBUG = DEBUG
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+if os.environ.get('DJANGO_ALLOWED_HOSTS'):
+    ALLOWED_HOSTS = os.environ['DJANGO_ALLOWED_HOSTS'].split(',')
+
+# Версии лент, страницы гостей и их ETag должны совпадать во всех
+# процессах. SQLite и так держит сайт на одной машине, поэтому
+# достаточно файлового кэша в общем каталоге
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'DJANGO_CACHE_DIR', os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+# С общим кэшем версии сбрасываются только записью
+FEED_VERSION_TIMEOUT = None
+
+# Соединение живёт между запросами потока, и прагмы выполняются
+# один раз на соединение, а не на каждый запрос
+DATABASES['default']['CONN_MAX_AGE'] = 10 * 60
+
+SQLITE_PRAGMAS = {
+    # Читатели не ждут писателя, писатель не ждёт читателей
+    'journal_mode': 'WAL',
+    # В WAL fsync только при контрольной точке; после сбоя питания
+    # могут пропасть последние транзакции, но не целостность базы
+    'synchronous': 'NORMAL',
+    # Чтение файла базы через отображение в память, до 256 МБ
+    'mmap_size': 256 * 1024 * 1024,
+    # Кэш страниц соединения; отрицательное значение — в КиБ (64 МБ)
+    'cache_size': -64 * 1024,
+    # Сколько миллисекунд ждать блокировку записи, прежде чем
+    # вернуть «database is locked»
+    'busy_timeout': 5000,
+}